@@ -10,12 +10,14 @@ interface Showcase {
   slug: string;
   status: 'uploaded' | 'processing' | 'ready' | 'failed';
   visibility: 'public' | 'unlisted' | 'private';
+  thumbnail_path: string | null;
   created_at: string;
 }
 
 export default function DashboardPage() {
   const { user } = useAuth();
   const [showcases, setShowcases] = useState<Showcase[]>([]);
+  const [thumbnails, setThumbnails] = useState<Record<string, string>>({});
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -32,6 +34,13 @@ export default function DashboardPage() {
         const { listShowcasesByUser } = await import('@/lib/db');
         const data = await listShowcasesByUser(user.id);
         setShowcases(data);
+
+        // One signing request for every card's thumbnail
+        const { getSignedUrls } = await import('@/lib/upload');
+        const paths = data
+          .map((showcase) => showcase.thumbnail_path)
+          .filter((path): path is string => !!path);
+        setThumbnails(await getSignedUrls(paths));
       } catch (error) {
         console.error('Failed to fetch showcases:', error);
       } finally {
@@ -68,7 +77,11 @@ export default function DashboardPage() {
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
           {showcases.map((showcase) => (
-            <ShowcaseCard key={showcase.id} showcase={showcase} />
+            <ShowcaseCard
+              key={showcase.id}
+              showcase={showcase}
+              thumbnailUrl={showcase.thumbnail_path ? thumbnails[showcase.thumbnail_path] : undefined}
+            />
           ))}
         </div>
       )}
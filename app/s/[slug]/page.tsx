@@ -1,9 +1,14 @@
 import { notFound } from 'next/navigation';
 import ViewerSTL from '@/components/ViewerSTL';
 import Badge from '@/components/Badge';
-import { getShowcaseBySlug } from '@/lib/db';
+import { getShowcaseBySlug, orderedLodPaths } from '@/lib/db';
 import { createServerClient } from '@/lib/supabaseServer';
 
+function formatBytes(bytes: number) {
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(0)} KB`;
+  return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+}
+
 interface PageProps {
   params: { slug: string };
 }
@@ -13,17 +18,21 @@ async function getShowcase(slug: string) {
 
   if (!showcase) return null;
 
-  // Generate signed URL if status is ready
+  // Generate signed URLs for every level of detail if status is ready
   let signedUrl = null;
+  let lodUrls: string[] = [];
   if (showcase.status === 'ready' && showcase.output_path) {
     const serverClient = createServerClient();
     const { data } = await serverClient.storage
       .from(process.env.SUPABASE_STORAGE_BUCKET_CONVERTED || 'cad-converted')
-      .createSignedUrl(showcase.output_path, 3600); // 1 hour expiry
-    signedUrl = data?.signedUrl || null;
+      .createSignedUrls(orderedLodPaths(showcase), 3600); // 1 hour expiry
+    lodUrls = (data || [])
+      .map((item) => item.signedUrl)
+      .filter((url): url is string => !!url);
+    signedUrl = lodUrls[lodUrls.length - 1] || null;
   }
 
-  return { ...showcase, signedUrl };
+  return { ...showcase, signedUrl, lodUrls };
 }
 
 export default async function ShowcasePage({ params }: PageProps) {
@@ -57,11 +66,17 @@ export default async function ShowcasePage({ params }: PageProps) {
           <Badge tone="blue">{showcase.visibility}</Badge>
           <Badge tone="green">{showcase.status}</Badge>
         </div>
+        {showcase.triangle_count != null && (
+          <p className="mt-2 text-sm text-gray-500">
+            {showcase.triangle_count.toLocaleString()} triangles
+            {showcase.file_size != null && ` · ${formatBytes(showcase.file_size)} STL`}
+          </p>
+        )}
       </div>
 
       {showcase.signedUrl ? (
         <div className="w-full h-[600px] border rounded-lg overflow-hidden">
-          <ViewerSTL url={showcase.signedUrl} />
+          <ViewerSTL url={showcase.signedUrl} urls={showcase.lodUrls} bbox={showcase.bbox} />
         </div>
       ) : (
         <div className="text-center py-12 text-gray-500">
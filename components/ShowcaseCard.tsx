@@ -10,9 +10,11 @@ interface ShowcaseCardProps {
     visibility: 'public' | 'unlisted' | 'private';
     created_at: string;
   };
+  // Signed URL of the worker-rendered PNG preview, when there is one
+  thumbnailUrl?: string;
 }
 
-export default function ShowcaseCard({ showcase }: ShowcaseCardProps) {
+export default function ShowcaseCard({ showcase, thumbnailUrl }: ShowcaseCardProps) {
   const statusColors = {
     uploaded: 'bg-gray-500',
     processing: 'bg-yellow-500',
@@ -29,6 +31,17 @@ export default function ShowcaseCard({ showcase }: ShowcaseCardProps) {
 
   return (
     <div className="border rounded-lg p-4 shadow hover:shadow-lg transition">
+      {thumbnailUrl && (
+        <img
+          src={thumbnailUrl}
+          alt={showcase.title}
+          loading="lazy"
+          width={256}
+          height={256}
+          className="w-full aspect-square object-cover rounded mb-3 bg-[#0a0a0b]"
+        />
+      )}
+
       <div className="flex justify-between items-start mb-2">
         <h3 className="text-lg font-semibold truncate">{showcase.title}</h3>
         <Badge tone={statusTone[showcase.status] as any}>
@@ -58,6 +58,7 @@ export default function UploadForm() {
           p_user_id: user.id,
           p_title: title,
           p_input_path: uploadResult.path,
+          p_input_bytes: file.size,
         }
       );
 
@@ -1,18 +1,75 @@
 // @ts-nocheck
 'use client';
-import React, { Suspense } from 'react';
+import React, { Suspense, useEffect, useMemo, useState } from 'react';
 import { Canvas, useLoader } from '@react-three/fiber';
 import { OrbitControls, Grid, Html } from '@react-three/drei';
 import { STLLoader } from 'three/examples/jsm/loaders/STLLoader.js';
+import { GLTFLoader } from 'three/examples/jsm/loaders/GLTFLoader.js';
 import * as THREE from 'three';
 
-function STLMesh({ url }: { url: string }) {
-  const geom = useLoader(STLLoader, url);
-  geom.computeVertexNormals();
+function isGLB(url: string) {
+  try {
+    return new URL(url).pathname.toLowerCase().endsWith('.glb');
+  } catch {
+    return url.toLowerCase().split('?')[0].endsWith('.glb');
+  }
+}
+
+// The worker's GLB is a single quantized mesh (KHR_mesh_quantization): bake its
+// node transform into plain float attributes so it frames like an STL
+async function loadGLBGeometry(url: string): Promise<THREE.BufferGeometry> {
+  const gltf = await new GLTFLoader().loadAsync(url);
+  let source: THREE.Mesh | null = null;
+  gltf.scene.traverse((obj) => {
+    if (!source && (obj as THREE.Mesh).isMesh) source = obj as THREE.Mesh;
+  });
+  if (!source) throw new Error('GLB contains no mesh');
+
+  source.updateWorldMatrix(true, false);
+  const geom = new THREE.BufferGeometry();
+  for (const name of ['position', 'normal']) {
+    const attr = source.geometry.getAttribute(name);
+    if (!attr) continue;
+    const values = new Float32Array(attr.count * 3);
+    for (let i = 0; i < attr.count; i++) {
+      values[i * 3] = attr.getX(i);
+      values[i * 3 + 1] = attr.getY(i);
+      values[i * 3 + 2] = attr.getZ(i);
+    }
+    geom.setAttribute(name, new THREE.BufferAttribute(values, 3));
+  }
+  geom.setIndex(source.geometry.getIndex());
+  geom.applyMatrix4(source.matrixWorld);
+  source.geometry.dispose();
+  return geom;
+}
 
-  // STL files always use BufferAttribute for positions
-  const positionAttr = geom.getAttribute('position') as THREE.BufferAttribute;
-  const box = new THREE.Box3().setFromBufferAttribute(positionAttr);
+// Bounding box precomputed by the worker ({ min: [x, y, z], max: [x, y, z] })
+type Bounds = { min: number[]; max: number[] } | null | undefined;
+
+// STLLoader copies the file's facet normals, which many exporters leave as
+// zeros; the GLB's normals come from the worker and are always unit length
+function hasUsableNormals(geom: THREE.BufferGeometry) {
+  const normals = geom.getAttribute('normal');
+  if (!normals) return false;
+  for (let i = 0; i < normals.count; i++) {
+    const x = normals.getX(i), y = normals.getY(i), z = normals.getZ(i);
+    if (x * x + y * y + z * z < 0.25) return false;
+  }
+  return true;
+}
+
+function FramedMesh({ geom, bbox }: { geom: THREE.BufferGeometry; bbox?: Bounds }) {
+  // Checked once per geometry rather than on every render
+  useMemo(() => {
+    if (!hasUsableNormals(geom)) geom.computeVertexNormals();
+  }, [geom]);
+
+  // Frame every level of detail by the full model's bounds when the worker
+  // measured them; otherwise fall back to scanning the positions
+  const box = bbox
+    ? new THREE.Box3(new THREE.Vector3(...bbox.min), new THREE.Vector3(...bbox.max))
+    : new THREE.Box3().setFromBufferAttribute(geom.getAttribute('position') as THREE.BufferAttribute);
   const size = new THREE.Vector3(); box.getSize(size);
   const maxDim = Math.max(size.x, size.y, size.z) || 1;
   const scale = 1.5 / maxDim;
@@ -24,7 +81,49 @@ function STLMesh({ url }: { url: string }) {
   );
 }
 
-export default function ViewerSTL({ url }: { url: string }){
+function STLMesh({ url, bbox }: { url: string; bbox?: Bounds }) {
+  const geom = useLoader(STLLoader, url);
+  return <FramedMesh geom={geom} bbox={bbox} />;
+}
+
+// Loads levels of detail (STL or GLB) coarsest first and swaps each one in as it arrives
+function ProgressiveMesh({ urls, bbox }: { urls: string[]; bbox?: Bounds }) {
+  const [geom, setGeom] = useState<THREE.BufferGeometry | null>(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    const loader = new STLLoader();
+
+    (async () => {
+      for (const url of urls) {
+        try {
+          const next = isGLB(url) ? await loadGLBGeometry(url) : await loader.loadAsync(url);
+          if (cancelled) {
+            next.dispose();
+            return;
+          }
+          setGeom((prev) => {
+            prev?.dispose();
+            return next;
+          });
+        } catch (err) {
+          console.error('Failed to load level of detail:', err);
+        }
+      }
+    })();
+
+    return () => {
+      cancelled = true;
+    };
+  }, [urls.join('|')]);
+
+  if (!geom) return <Html center className="text-white/80 text-sm">Loading STL…</Html>;
+  return <FramedMesh geom={geom} bbox={bbox} />;
+}
+
+export default function ViewerSTL({ url, urls, bbox }: { url: string; urls?: string[]; bbox?: Bounds }){
+  const progressive = urls && urls.length > 0;
+
   return (
     <div className="relative h-[460px] w-full rounded-2xl overflow-hidden border border-white/10 bg-[#0a0a0b]">
       <Canvas shadows camera={{ position: [2.5,2,2.5], fov: 42 }}>
@@ -32,7 +131,7 @@ export default function ViewerSTL({ url }: { url: string }){
         <ambientLight intensity={0.6} />
         <directionalLight position={[5,8,5]} intensity={1} castShadow />
         <Suspense fallback={<Html center className="text-white/80 text-sm">Loading STL…</Html>}>
-          {url ? <STLMesh url={url} /> : <Html center className="text-white/60 text-sm">Paste a public STL URL or choose a local .stl file</Html>}
+          {progressive ? <ProgressiveMesh urls={urls} bbox={bbox} /> : url ? <STLMesh url={url} bbox={bbox} /> : <Html center className="text-white/60 text-sm">Paste a public STL URL or choose a local .stl file</Html>}
         </Suspense>
         <Grid args={[8,8]} position={[0,-0.75,0]} />
         <OrbitControls makeDefault enableDamping dampingFactor={0.08} />
@@ -1,6 +1,6 @@
 -- D1 Verification Query
 -- Run this AFTER deploying schema.sql and rpc_create_showcase.sql
--- Expected: 2 tables, 1 view, 3 functions
+-- Expected: 2 tables, 1 view, 5 functions
 
 SELECT 'Tables' as type, table_name as name FROM information_schema.tables
 WHERE table_schema = 'public' AND table_name IN ('showcases', 'jobs')
@@ -9,7 +9,7 @@ SELECT 'View' as type, table_name as name FROM information_schema.views
 WHERE table_schema = 'public' AND table_name = 'public_showcases'
 UNION ALL
 SELECT 'Function' as type, proname as name FROM pg_proc
-WHERE proname IN ('create_showcase_and_job', 'ensure_unique_slug', 'tg_set_updated_at')
+WHERE proname IN ('create_showcase_and_job', 'claim_jobs', 'renew_job_leases', 'ensure_unique_slug', 'tg_set_updated_at')
 ORDER BY type, name;
 
 -- Additional verification: Check RLS is enabled
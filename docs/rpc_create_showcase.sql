@@ -1,7 +1,12 @@
+-- p_input_bytes is the uploaded file's size; together with the format taken
+-- from the path it lets claim_jobs favour cheap jobs
+drop function if exists public.create_showcase_and_job(uuid, text, text);
+
 create or replace function public.create_showcase_and_job(
   p_user_id uuid,
   p_title text,
-  p_input_path text
+  p_input_path text,
+  p_input_bytes bigint default null
 ) returns uuid
 language plpgsql
 security definer
@@ -12,9 +17,131 @@ begin
   values (p_user_id, p_title, public.ensure_unique_slug(p_title), p_input_path, 'uploaded')
   returning id into v_showcase_id;
 
-  insert into public.jobs (showcase_id, input_path, status)
-  values (v_showcase_id, p_input_path, 'queued');
+  insert into public.jobs (showcase_id, user_id, input_path, input_bytes, input_format, status)
+  values (v_showcase_id, p_user_id, p_input_path, p_input_bytes,
+          lower(substring(p_input_path from '\.([^./]+)$')), 'queued');
 
   return v_showcase_id;
 end;
 $$;
+
+-- Atomically claim up to p_limit queued jobs for a worker.
+-- SKIP LOCKED lets several workers call this concurrently without ever
+-- handing the same job to two of them.
+--
+-- Every claim carries a lease of p_lease_seconds that the worker renews with
+-- renew_job_leases while it works. Running jobs whose lease has expired (the
+-- worker died or lost its connection) are re-queued first, or failed once they
+-- have been attempted p_max_attempts times.
+--
+-- Jobs are not claimed strictly FIFO but by a virtual start time:
+--   created_at
+--   + p_fair_share_seconds per job the same user already has running or queued ahead
+--   + the job's estimated cost (input size x format factor), capped at p_max_cost_penalty
+-- so one user's bulk upload interleaves with everyone else's work and cheap jobs
+-- (STL passthrough, small files) overtake expensive ones. Every penalty is a
+-- fixed offset from created_at, so a delayed job ages past newer arrivals and
+-- never starves.
+drop function if exists public.claim_jobs(text, int);
+drop function if exists public.claim_jobs(text, int, int, int);
+
+create or replace function public.claim_jobs(
+  p_worker_id text,
+  p_limit int default 1,
+  p_lease_seconds int default 120,
+  p_max_attempts int default 3,
+  p_fair_share_seconds int default 60,
+  p_max_cost_penalty int default 600
+) returns setof public.jobs
+language plpgsql
+security definer
+as $$
+begin
+  with expired as (
+    update public.jobs j
+       set status = case when j.attempt_count >= p_max_attempts then 'failed' else 'queued' end::job_status_t,
+           error = case when j.attempt_count >= p_max_attempts
+                        then format('Lease expired on %s after %s attempt(s)', j.claimed_by, j.attempt_count)
+                        else j.error end,
+           finished_at = case when j.attempt_count >= p_max_attempts then now() else null end,
+           claimed_by = null,
+           lease_expires_at = null
+     where j.id in (
+       select r.id
+         from public.jobs r
+        where r.status = 'running'
+          and coalesce(r.lease_expires_at, r.started_at + make_interval(secs => p_lease_seconds)) < now()
+        for update skip locked
+     )
+    returning j.showcase_id, j.status
+  )
+  update public.showcases s
+     set status = 'failed'
+    from expired e
+   where s.id = e.showcase_id and e.status = 'failed';
+
+  return query
+  with running as (
+    select r.user_id, count(*) as n
+      from public.jobs r
+     where r.status = 'running'
+     group by r.user_id
+  ),
+  ranked as (
+    select q.id,
+           q.created_at + make_interval(secs => (
+             (row_number() over (partition by q.user_id order by q.created_at) - 1 + coalesce(r.n, 0))
+               * p_fair_share_seconds
+             + least(
+                 -- Rough seconds of work: MB of input times a per-format factor
+                 coalesce(q.input_bytes, 5 * 1024 * 1024) / 1048576.0
+                   * case q.input_format when 'stl' then 0.2 when 'obj' then 1 when 'step' then 5 when 'stp' then 5 else 2 end,
+                 p_max_cost_penalty)
+           )::double precision) as virtual_start
+      from public.jobs q
+      left join running r on r.user_id is not distinct from q.user_id
+     where q.status = 'queued'
+  )
+  update public.jobs j
+     set status = 'running',
+         started_at = now(),
+         claimed_by = p_worker_id,
+         attempt_count = j.attempt_count + 1,
+         lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+   where j.id in (
+     select q.id
+       from public.jobs q
+       join ranked k on k.id = q.id
+      where q.status = 'queued'
+      order by k.virtual_start
+      limit greatest(p_limit, 0)
+      for update of q skip locked
+   )
+  returning j.*;
+end;
+$$;
+
+revoke all on function public.claim_jobs(text, int, int, int, int, int) from public;
+grant execute on function public.claim_jobs(text, int, int, int, int, int) to service_role;
+
+-- Heartbeat: extend the leases a worker still holds. Returns the ids that were
+-- renewed; a missing id means the lease was lost and the job belongs to
+-- someone else now.
+create or replace function public.renew_job_leases(
+  p_worker_id text,
+  p_job_ids uuid[],
+  p_lease_seconds int default 120
+) returns setof uuid
+language sql
+security definer
+as $$
+  update public.jobs
+     set lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+   where id = any(p_job_ids)
+     and claimed_by = p_worker_id
+     and status = 'running'
+  returning id;
+$$;
+
+revoke all on function public.renew_job_leases(text, uuid[], int) from public;
+grant execute on function public.renew_job_leases(text, uuid[], int) to service_role;
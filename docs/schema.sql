@@ -23,6 +23,16 @@ create table if not exists public.showcases (
   status showcase_status_t not null default 'uploaded',
   input_path text,
   output_path text,
+  lod_paths jsonb,
+  web_mesh_path text,
+  thumbnail_path text,
+  -- Mesh statistics of the converted STL, computed by the worker
+  bbox jsonb,
+  triangle_count bigint,
+  vertex_count bigint,
+  surface_area double precision,
+  volume double precision,
+  file_size bigint,
   created_at timestamptz not null default now(),
   updated_at timestamptz not null default now()
 );
@@ -30,17 +40,63 @@ create table if not exists public.showcases (
 create table if not exists public.jobs (
   id uuid primary key default gen_random_uuid(),
   showcase_id uuid not null references public.showcases(id) on delete cascade,
+  user_id uuid,
   input_path text not null,
+  -- Recorded at upload so claim_jobs can schedule by cost
+  input_format text,
+  input_bytes bigint,
   output_path text,
   status job_status_t not null default 'queued',
   attempt_count int not null default 0,
+  claimed_by text,
+  lease_expires_at timestamptz,
   started_at timestamptz,
   finished_at timestamptz,
   error text,
+  -- Filled in by the worker: seconds per stage (queue_wait, download, convert, ...)
+  stage_timings jsonb,
+  output_bytes bigint,
+  triangle_count bigint,
   created_at timestamptz not null default now(),
   updated_at timestamptz not null default now()
 );
 
+-- Converted outputs keyed by sha256(input bytes + conversion parameters)
+create table if not exists public.conversion_cache (
+  key text primary key,
+  object_path text not null,
+  artifacts jsonb,
+  size_bytes bigint,
+  metadata jsonb,
+  hit_count int not null default 0,
+  last_used_at timestamptz not null default now(),
+  created_at timestamptz not null default now()
+);
+
+-- Columns added after the initial release (no-ops on fresh installs)
+alter table public.jobs add column if not exists claimed_by text;
+alter table public.jobs add column if not exists lease_expires_at timestamptz;
+alter table public.showcases add column if not exists lod_paths jsonb;
+alter table public.showcases add column if not exists web_mesh_path text;
+alter table public.showcases add column if not exists thumbnail_path text;
+alter table public.showcases add column if not exists bbox jsonb;
+alter table public.showcases add column if not exists triangle_count bigint;
+alter table public.showcases add column if not exists vertex_count bigint;
+alter table public.showcases add column if not exists surface_area double precision;
+alter table public.showcases add column if not exists volume double precision;
+alter table public.showcases add column if not exists file_size bigint;
+alter table public.conversion_cache add column if not exists artifacts jsonb;
+alter table public.jobs add column if not exists stage_timings jsonb;
+alter table public.jobs add column if not exists input_bytes bigint;
+alter table public.jobs add column if not exists output_bytes bigint;
+alter table public.jobs add column if not exists triangle_count bigint;
+alter table public.conversion_cache add column if not exists metadata jsonb;
+alter table public.jobs add column if not exists user_id uuid;
+alter table public.jobs add column if not exists input_format text;
+-- Backfill the scheduler's inputs for jobs created before they were recorded
+update public.jobs j set user_id = s.user_id from public.showcases s where s.id = j.showcase_id and j.user_id is null;
+update public.jobs set input_format = lower(substring(input_path from '\.([^./]+)$')) where input_format is null;
+
 create or replace function public.tg_set_updated_at() returns trigger language plpgsql as $$
 begin new.updated_at = now(); return new; end $$;
 
@@ -52,18 +108,32 @@ drop trigger if exists tr_jobs_set_updated on public.jobs;
 create trigger tr_jobs_set_updated before update on public.jobs
 for each row execute function public.tg_set_updated_at();
 
+-- Wake idle workers (LISTEN jobs_queued) as soon as a job becomes claimable
+create or replace function public.tg_notify_job_queued() returns trigger language plpgsql as $$
+begin perform pg_notify('jobs_queued', new.id::text); return new; end $$;
+
+drop trigger if exists tr_jobs_notify_queued on public.jobs;
+create trigger tr_jobs_notify_queued after insert or update of status on public.jobs
+for each row when (new.status = 'queued') execute function public.tg_notify_job_queued();
+
 create index if not exists idx_showcases_user_id on public.showcases(user_id);
 create index if not exists idx_jobs_showcase_id on public.jobs(showcase_id);
 create index if not exists idx_jobs_status on public.jobs(status);
+create index if not exists idx_jobs_queued_created on public.jobs(created_at) where status = 'queued';
+create index if not exists idx_jobs_user_status on public.jobs(user_id, status);
+create index if not exists idx_jobs_running_lease on public.jobs(lease_expires_at) where status = 'running';
+create index if not exists idx_conversion_cache_last_used on public.conversion_cache(last_used_at);
 
 drop view if exists public.public_showcases cascade;
 create view public.public_showcases as
-select id, title, slug, visibility, status, output_path, created_at
+select id, title, slug, visibility, status, output_path, lod_paths, web_mesh_path, thumbnail_path,
+       bbox, triangle_count, vertex_count, surface_area, volume, file_size, created_at
 from public.showcases
 where visibility in ('public','unlisted');
 
 alter table public.showcases enable row level security;
 alter table public.jobs enable row level security;
+alter table public.conversion_cache enable row level security;
 
 do $$ begin
   if exists (select 1 from pg_policies where schemaname='public' and tablename='showcases' and policyname='owner_all_showcases') then
@@ -96,10 +166,21 @@ create policy service_role_write_jobs on public.jobs
   as permissive for all to service_role
   using (true) with check (true);
 
+do $$ begin
+  if exists (select 1 from pg_policies where schemaname='public' and tablename='conversion_cache' and policyname='service_role_all_conversion_cache') then
+    drop policy service_role_all_conversion_cache on public.conversion_cache;
+  end if;
+end $$;
+
+create policy service_role_all_conversion_cache on public.conversion_cache
+  as permissive for all to service_role
+  using (true) with check (true);
+
 grant select on public.public_showcases to anon;
 grant select, insert, update, delete on public.showcases to authenticated;
 grant select on public.jobs to authenticated;
 grant all privileges on public.jobs to service_role;
+grant all privileges on public.conversion_cache to service_role;
 
 create or replace function public.ensure_unique_slug(base text) returns text
 language plpgsql as $$
@@ -2,6 +2,12 @@
 import { supabase } from './supabaseClient';
 import { createServerClient } from './supabaseServer';
 
+// Axis-aligned bounding box of the converted model, computed by the worker
+export interface MeshBounds {
+  min: [number, number, number];
+  max: [number, number, number];
+}
+
 export interface Showcase {
   id: string;
   user_id: string;
@@ -11,6 +17,15 @@ export interface Showcase {
   status: 'uploaded' | 'processing' | 'ready' | 'failed';
   input_path: string | null;
   output_path: string | null;
+  lod_paths: Record<string, string> | null;
+  web_mesh_path: string | null;
+  thumbnail_path: string | null;
+  bbox: MeshBounds | null;
+  triangle_count: number | null;
+  vertex_count: number | null;
+  surface_area: number | null;
+  volume: number | null;
+  file_size: number | null;
   created_at: string;
   updated_at: string;
 }
@@ -18,7 +33,10 @@ export interface Showcase {
 export interface Job {
   id: string;
   showcase_id: string;
+  user_id: string | null;
   input_path: string;
+  input_format: string | null;
+  input_bytes: number | null;
   output_path: string | null;
   status: 'queued' | 'running' | 'complete' | 'failed';
   attempt_count: number;
@@ -95,6 +113,33 @@ export async function getJobStatus(showcaseId: string): Promise<Job | null> {
   return data as Job;
 }
 
+// Known levels of detail, coarsest first; the worker always writes "full"
+const LOD_ORDER = ['preview', 'medium', 'full'];
+
+/**
+ * Converted file paths of a showcase, ordered from coarsest to full resolution
+ * @param showcase - Showcase with output_path and (optionally) lod_paths / web_mesh_path
+ * @returns Paths in the cad-converted bucket, ending with the full-resolution model
+ *          (the compact GLB when the worker wrote one, the STL otherwise)
+ */
+export function orderedLodPaths(
+  showcase: Pick<Showcase, 'output_path' | 'lod_paths' | 'web_mesh_path'>
+): string[] {
+  const lods = { ...(showcase.lod_paths || {}) };
+  if (showcase.output_path) lods.full = showcase.output_path;
+  if (showcase.web_mesh_path) lods.full = showcase.web_mesh_path;
+
+  const rank = (name: string) => {
+    const i = LOD_ORDER.indexOf(name);
+    // Unknown levels go after the known coarse ones but always before full
+    return i === -1 ? LOD_ORDER.length - 1.5 : i;
+  };
+
+  return Object.keys(lods)
+    .sort((a, b) => rank(a) - rank(b))
+    .map((name) => lods[name]);
+}
+
 /**
  * Legacy alias for getUserShowcases (for backwards compatibility)
  */
@@ -12,4 +12,13 @@ export interface Showcase {
   updated_at: string;
   input_path?: string;
   output_path?: string;
+  lod_paths?: Record<string, string> | null;
+  web_mesh_path?: string | null;
+  thumbnail_path?: string | null;
+  bbox?: { min: [number, number, number]; max: [number, number, number] } | null;
+  triangle_count?: number | null;
+  vertex_count?: number | null;
+  surface_area?: number | null;
+  volume?: number | null;
+  file_size?: number | null;
 }
@@ -84,3 +84,31 @@ export async function getSignedUrl(path: string): Promise<string | null> {
     return null;
   }
 }
+
+/**
+ * Sign many cad-converted paths (e.g. every thumbnail on a page) in one request
+ * @param paths - File paths in the cad-converted bucket
+ * @returns Map from path to signed URL; paths that could not be signed are omitted
+ */
+export async function getSignedUrls(paths: string[]): Promise<Record<string, string>> {
+  if (paths.length === 0) return {};
+  try {
+    const { data, error } = await supabase.storage
+      .from('cad-converted')
+      .createSignedUrls(paths, 3600); // 60 minutes
+
+    if (error) {
+      console.error('Signed URLs error:', error);
+      return {};
+    }
+
+    const urls: Record<string, string> = {};
+    for (const item of data || []) {
+      if (item.path && item.signedUrl) urls[item.path] = item.signedUrl;
+    }
+    return urls;
+  } catch (err) {
+    console.error('Signed URLs exception:', err);
+    return {};
+  }
+}
@@ -6,20 +6,30 @@ Comprehensive Supabase Database Verification Script
 This script checks:
 1. Tables structure (showcases, jobs)
 2. Views (public_showcases)
-3. Functions (create_showcase_and_job, ensure_unique_slug, tg_set_updated_at)
+3. Functions (create_showcase_and_job, claim_jobs, renew_job_leases, ensure_unique_slug, tg_set_updated_at)
 4. RLS Policies
 5. Custom Types (enums)
 6. Extensions (pgcrypto, uuid-ossp)
 7. Triggers
 8. Indexes
+
+With --report it instead prints a JSON queue health report: jobs by status,
+the oldest queued job, stuck running jobs, failure rate and queue-wait /
+processing-time percentiles over a time window.
 """
 
 import os
 import sys
 import json
+import math
+import argparse
+import threading
+import http.client
 import urllib.request
 import urllib.error
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlsplit, quote
 from typing import Dict, Any, Optional, List
 
 # Fix encoding issues on Windows
@@ -150,6 +160,21 @@ def check_function(func_name: str, params: Dict[str, Any]):
         log_result('Functions', func_name, 'PASS', 'Function exists and callable')
         return True
 
+def probe_function(func_name: str, params: Dict[str, Any]):
+    """Check that a function exists without running it (params must not cast)"""
+    data, error = make_request('POST', f'/rest/v1/rpc/{func_name}', params)
+    message = (error or '').lower()
+
+    if 'does not exist' in message or 'could not find the function' in message:
+        log_result('Functions', func_name, 'FAIL', 'Function does not exist')
+        return False
+    elif 'invalid input syntax' in message:
+        log_result('Functions', func_name, 'PASS', 'Function exists (probed without running it)')
+        return True
+    else:
+        log_result('Functions', func_name, 'WARN', f'Unexpected probe response: {error or data}')
+        return False
+
 def check1_tables():
     """Check tables structure"""
     print('\n=== 1. TABLES CHECK ===')
@@ -161,8 +186,10 @@ def check1_tables():
     check_table('showcases', showcases_columns)
 
     jobs_columns = [
-        'id', 'showcase_id', 'input_path', 'output_path', 'status',
-        'attempt_count', 'started_at', 'finished_at', 'error',
+        'id', 'showcase_id', 'user_id', 'input_path', 'input_format', 'input_bytes',
+        'output_path', 'status',
+        'attempt_count', 'claimed_by', 'lease_expires_at', 'started_at', 'finished_at', 'error',
+        'stage_timings', 'output_bytes', 'triangle_count',
         'created_at', 'updated_at'
     ]
     check_table('jobs', jobs_columns)
@@ -180,7 +207,21 @@ def check3_functions():
     check_function('create_showcase_and_job', {
         'p_user_id': '00000000-0000-0000-0000-000000000000',
         'p_title': '__test_verification__',
-        'p_input_path': '/test/path.dwg'
+        'p_input_path': '/test/path.dwg',
+        'p_input_bytes': 0
+    })
+
+    # claim_jobs re-queues expired leases even with a zero limit, so it is
+    # only probed with an argument that fails to cast before the body runs
+    probe_function('claim_jobs', {
+        'p_worker_id': '__test_verification__',
+        'p_limit': '__not_a_number__'
+    })
+
+    # Test renew_job_leases (no job ids, nothing to renew)
+    check_function('renew_job_leases', {
+        'p_worker_id': '__test_verification__',
+        'p_job_ids': []
     })
 
     # Test ensure_unique_slug
@@ -277,6 +318,194 @@ def check8_indexes():
     log_result('Indexes', 'idx_jobs_status', 'WARN',
                'Cannot verify directly - check schema.sql deployment')
 
+# ---------------------------------------------------------------------------
+# Queue report (--report)
+# ---------------------------------------------------------------------------
+
+JOB_STATUSES = ['queued', 'running', 'complete', 'failed']
+REPORT_COLUMNS = 'id,status,created_at,started_at,finished_at'
+
+class RestClient:
+    """PostgREST GETs over one keep-alive connection per thread"""
+
+    def __init__(self, base_url: str, key: str, timeout: float = 30):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Accept': 'application/json',
+        }
+        self.local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self.local.conn = cls(self.netloc, timeout=self.timeout)
+        return conn
+
+    def get(self, path: str, headers: Optional[Dict[str, str]] = None, method: str = 'GET') -> tuple:
+        """Returns (body, response headers); raises RuntimeError on HTTP errors"""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, self.prefix + path, headers={**self.headers, **(headers or {})})
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection: reconnect once
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+        if response.status >= 400:
+            raise RuntimeError(f'HTTP {response.status} for {path}: {body.decode("utf-8", "replace")}')
+        return (json.loads(body) if body else None), response
+
+    def count(self, table: str, query: str) -> int:
+        """Exact row count from Content-Range, without fetching rows"""
+        _, response = self.get(f'/rest/v1/{table}?{query}', {'Prefer': 'count=exact'}, method='HEAD')
+        return int(response.getheader('Content-Range', '*/0').split('/')[-1])
+
+    def select_all(self, pool: ThreadPoolExecutor, table: str, query: str, page_size: int) -> List[Dict]:
+        """Every matching row: the first page returns the total, the rest are fetched concurrently"""
+        path = f'/rest/v1/{table}?{query}'
+
+        def rows_range(first: int, last: int, headers: Optional[Dict[str, str]] = None) -> tuple:
+            return self.get(path, {'Range-Unit': 'items', 'Range': f'{first}-{last}', **(headers or {})})
+
+        def fetch(offset: int, count: int) -> List[Dict]:
+            # A short response (PostgREST's max-rows cap) is continued, not taken as the whole page
+            rows: List[Dict] = []
+            while len(rows) < count:
+                chunk, _ = rows_range(offset + len(rows), offset + count - 1)
+                if not chunk:
+                    break
+                rows.extend(chunk)
+            return rows
+
+        rows, response = rows_range(0, page_size - 1, {'Prefer': 'count=exact'})
+        rows = rows or []
+        total = int(response.getheader('Content-Range', '*/0').split('/')[-1])
+        # A first page shorter than asked for reveals the server's cap: page by that instead
+        step = len(rows) if 0 < len(rows) < min(page_size, total) else page_size
+        offsets = range(len(rows), total, step)
+        for chunk in pool.map(lambda offset: fetch(offset, min(step, total - offset)), offsets):
+            rows.extend(chunk)
+        return rows
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """PostgREST timestamptz (fractional seconds of any length) -> aware datetime"""
+    if not value:
+        return None
+    value = value.replace('Z', '+00:00')
+    if '.' in value:
+        head, rest = value.split('.', 1)
+        digits = len(rest) - len(rest.lstrip('0123456789'))
+        value = f'{head}.{rest[:digits][:6].ljust(6, "0")}{rest[digits:]}'
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_window(value: str) -> timedelta:
+    """'90m', '24h', '7d' or plain seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if value and value[-1] in units:
+        return timedelta(seconds=float(value[:-1]) * units[value[-1]])
+    return timedelta(seconds=float(value))
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 plus the sample count"""
+    values = sorted(values)
+    summary: Dict[str, Any] = {'count': len(values)}
+    for p in (50, 95, 99):
+        summary[f'p{p}'] = round(values[max(math.ceil(p / 100 * len(values)) - 1, 0)], 3) if values else None
+    return summary
+
+def queue_report(window: timedelta, stuck_after: float, page_size: int, concurrency: int) -> Dict[str, Any]:
+    client = RestClient(SUPABASE_URL, SUPABASE_KEY)
+    now = datetime.now(timezone.utc)
+    since = quote((now - window).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        depth = {
+            status: pool.submit(client.count, 'jobs', f'status=eq.{status}&limit=0')
+            for status in JOB_STATUSES
+        }
+        oldest = pool.submit(client.get, '/rest/v1/jobs?status=eq.queued&select=id,created_at&order=created_at.asc&limit=1')
+        # Later pages of both listings are fetched on the pool alongside the counts
+        running_rows = client.select_all(
+            pool, 'jobs', 'status=eq.running&select=id,claimed_by,attempt_count,started_at,lease_expires_at&order=id',
+            page_size,
+        )
+        recent_rows = client.select_all(
+            pool, 'jobs', f'created_at=gte.{since}&select={REPORT_COLUMNS}&order=id', page_size,
+        )
+        depth = {status: future.result() for status, future in depth.items()}
+        oldest_rows, _ = oldest.result()
+
+    oldest_created = parse_timestamp(oldest_rows[0]['created_at']) if oldest_rows else None
+
+    stuck = []
+    for job in running_rows:
+        started = parse_timestamp(job.get('started_at'))
+        lease = parse_timestamp(job.get('lease_expires_at'))
+        running_for = (now - started).total_seconds() if started else None
+        reasons = []
+        if lease and lease < now:
+            reasons.append('lease_expired')
+        if running_for is not None and running_for > stuck_after:
+            reasons.append('long_running')
+        if reasons:
+            stuck.append({
+                'id': job['id'],
+                'claimed_by': job.get('claimed_by'),
+                'attempt_count': job.get('attempt_count'),
+                'running_seconds': round(running_for, 3) if running_for is not None else None,
+                'reasons': reasons,
+            })
+
+    queue_wait, processing = [], []
+    finished = {'complete': 0, 'failed': 0}
+    for job in recent_rows:
+        created = parse_timestamp(job['created_at'])
+        started = parse_timestamp(job.get('started_at'))
+        done = parse_timestamp(job.get('finished_at'))
+        if started:
+            queue_wait.append((started - created).total_seconds())
+        if job['status'] in finished:
+            finished[job['status']] += 1
+            if job['status'] == 'complete' and started and done:
+                processing.append((done - started).total_seconds())
+
+    total_finished = finished['complete'] + finished['failed']
+    return {
+        'generated_at': now.isoformat(),
+        'window_seconds': window.total_seconds(),
+        'depth': depth,
+        'oldest_queued': {
+            'id': oldest_rows[0]['id'],
+            'age_seconds': round((now - oldest_created).total_seconds(), 3),
+        } if oldest_rows else None,
+        'stuck_running': {
+            'threshold_seconds': stuck_after,
+            'count': len(stuck),
+            'jobs': stuck,
+        },
+        'window': {
+            'created': len(recent_rows),
+            'complete': finished['complete'],
+            'failed': finished['failed'],
+            'failure_rate': round(finished['failed'] / total_finished, 4) if total_finished else None,
+            'queue_wait_seconds': percentiles(queue_wait),
+            'processing_seconds': percentiles(processing),
+        },
+    }
+
 def main():
     """Main verification function"""
     print('╔═══════════════════════════════════════════════════════════╗')
@@ -327,4 +556,22 @@ def main():
     exit(1 if checks['failed'] > 0 else 0)
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Verify the Supabase schema or report on the job queue')
+    parser.add_argument('--report', action='store_true', help='print a JSON queue health report instead')
+    parser.add_argument('--window', default='24h', help='report on jobs created within this window (e.g. 90m, 24h, 7d)')
+    parser.add_argument('--stuck-after', type=float, default=900,
+                        help='running jobs older than this many seconds count as stuck')
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help="rows per request (pages past the server's max-rows cap are continued)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.report:
+        try:
+            report = queue_report(parse_window(args.window), args.stuck_after, args.page_size, args.concurrency)
+        except Exception as e:
+            print(json.dumps({'error': str(e)}))
+            exit(2)
+        print(json.dumps(report, indent=2))
+    else:
+        main()
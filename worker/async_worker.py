@@ -0,0 +1,338 @@
+"""Pipelined asyncio worker
+
+Jobs flow through three stages connected by bounded queues:
+
+  claim -> download + cache lookup -> convert + derive -> upload + finish
+
+Transfers and table updates share one pooled httpx.AsyncClient and overlap
+with the conversions running in the engine processes, so while one job is in
+FreeCAD the next job's input is already downloading and the previous job's
+outputs are uploading. Configuration is the same as worker.py, plus
+PIPELINE_PREFETCH and PIPELINE_TRANSFER_CONCURRENCY.
+
+Usage: python async_worker.py
+"""
+import os
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from worker import (
+    JOB_FAIR_SHARE_SECONDS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_MAX_COST_PENALTY_SECONDS,
+    METRICS_HOST, METRICS_PORT, POLL_INTERVAL, SUPABASE_DB_URL, SUPABASE_SERVICE_ROLE_KEY,
+    SUPABASE_URL, WORKER_CONCURRENCY, WORKER_ID, CONTENT_TYPES, LeaseLost,
+    cache_metrics, conversion_cache, converted_path, derive_outputs, engine_pool, ensure_lease,
+    heartbeat_loop, init_clients, input_cache_key, leased_jobs, leases_lock, listener_connected, lost_leases, measure_output,
+    next_poll_delay, queue_wait_seconds, ready_showcase_fields, remove_job_files, wakeup,
+)
+from metrics import BYTES, ERRORS, JOB_LATENCY, JOBS, QUEUE_WAIT, TRIANGLES, JobTimer, start_metrics_server
+from notify import start_listener
+from stl_io import binary_facet_count, normalize_stl
+from storage import AsyncStorageClient
+
+# Jobs claimed beyond the number of engines, so the next input is already on
+# disk when an engine frees up
+PIPELINE_PREFETCH = int(os.getenv("PIPELINE_PREFETCH", str(WORKER_CONCURRENCY)))
+# Concurrent downloads, and concurrent job uploads, per worker
+PIPELINE_TRANSFER_CONCURRENCY = int(os.getenv("PIPELINE_TRANSFER_CONCURRENCY", "4"))
+
+class PostgrestClient:
+    """The few PostgREST calls the pipeline makes, on the shared async client"""
+
+    def __init__(self, url: str, key: str, http: httpx.AsyncClient):
+        self.base = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.http = http
+
+    async def rpc(self, name: str, params: Dict[str, Any]) -> Any:
+        response = await self.http.post(f"{self.base}/rpc/{name}", json=params, headers=self.headers)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return response.json()
+
+    async def update(self, table: str, values: Dict[str, Any], **filters: str) -> List[Dict[str, Any]]:
+        """PATCH rows matching every `column=value` filter; returns the updated rows"""
+        response = await self.http.patch(
+            f"{self.base}/{table}",
+            params={column: f"eq.{value}" for column, value in filters.items()},
+            json=values,
+            headers=dict(self.headers, Prefer="return=representation"),
+        )
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return response.json()
+
+class PipelineJob:
+    """A claimed job and everything the stages learn about it"""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.row = row
+        self.id = row["id"]
+        self.user_id = row["input_path"].split('/')[0]
+        self.timer = JobTimer()
+        self.stats: Dict[str, Any] = {}
+        self.local_input: Optional[str] = None
+        self.local_outputs: Dict[str, str] = {}
+        self.outputs: Optional[Dict[str, str]] = None
+        self.mesh: Dict[str, Any] = {}
+        self.key: Optional[str] = None
+        # Counted against the claim budget until its conversion is done
+        self.holds_slot = True
+
+class Pipeline:
+    def __init__(self, http: httpx.AsyncClient):
+        self.rest = PostgrestClient(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, http)
+        self.storage = AsyncStorageClient(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, http)
+        self.capacity = WORKER_CONCURRENCY + PIPELINE_PREFETCH
+        self.slots_used = 0
+        self.backlogged = False
+        self.downloads: "asyncio.Queue[PipelineJob]" = asyncio.Queue()
+        self.conversions: "asyncio.Queue[PipelineJob]" = asyncio.Queue(maxsize=PIPELINE_PREFETCH)
+        self.uploads: "asyncio.Queue[PipelineJob]" = asyncio.Queue(maxsize=PIPELINE_TRANSFER_CONCURRENCY)
+
+    def release_slot(self, job: PipelineJob):
+        if job.holds_slot:
+            job.holds_slot = False
+            self.slots_used -= 1
+            if self.backlogged:
+                wakeup.set()
+
+    async def claim(self):
+        """Keep the pipeline topped up with claimed jobs"""
+        delay = POLL_INTERVAL
+        while True:
+            wakeup.clear()
+            free = self.capacity - self.slots_used
+            claimed = 0
+            if free > 0:
+                try:
+                    rows = await self.rest.rpc("claim_jobs", {
+                        "p_worker_id": WORKER_ID,
+                        "p_limit": free,
+                        "p_lease_seconds": JOB_LEASE_SECONDS,
+                        "p_max_attempts": JOB_MAX_ATTEMPTS,
+                        "p_fair_share_seconds": JOB_FAIR_SHARE_SECONDS,
+                        "p_max_cost_penalty": JOB_MAX_COST_PENALTY_SECONDS
+                    })
+                except Exception as e:
+                    print(f"[pipeline] claim failed: {e}")
+                    rows = []
+
+                for row in rows:
+                    print(f"[pipeline] claimed job {row['id']}")
+                    job = PipelineJob(row)
+                    with leases_lock:
+                        leased_jobs.add(job.id)
+                    wait = queue_wait_seconds(row)
+                    if wait is not None:
+                        job.timer.stages["queue_wait"] = round(wait, 4)
+                        QUEUE_WAIT.observe(wait)
+                    self.slots_used += 1
+                    self.downloads.put_nowait(job)
+
+                claimed = len(rows)
+                self.backlogged = claimed == free
+
+            delay = next_poll_delay(delay, free, claimed)
+            # Woken early by NOTIFY or by a slot freeing up while backlogged
+            await asyncio.to_thread(wakeup.wait, delay)
+
+    async def download(self):
+        while True:
+            job = await self.downloads.get()
+            try:
+                await self.fetch_input(job)
+            except Exception as e:
+                await self.fail(job, e)
+                continue
+
+            if job.outputs is not None:
+                # Cache hit: nothing to convert
+                self.release_slot(job)
+                await self.uploads.put(job)
+            else:
+                await self.conversions.put(job)
+
+    async def fetch_input(self, job: PipelineJob):
+        input_path = job.row["input_path"]
+        with job.timer.stage("download"):
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{input_path.split('.')[-1]}")
+            temp_file.close()
+            job.local_input = temp_file.name
+            try:
+                size = await self.storage.download_to_file("cad-uploaded", input_path, job.local_input)
+            except Exception as e:
+                raise Exception(f"Download failed: {e}")
+        job.stats["input_bytes"] = size
+        BYTES.inc(size, direction="download")
+
+        with job.timer.stage("hash"):
+            job.key = await asyncio.to_thread(input_cache_key, job.local_input)
+        with job.timer.stage("cache_fetch"):
+            cached = await asyncio.to_thread(
+                conversion_cache.fetch, job.key,
+                lambda name, ext: converted_path(job.user_id, job.id, name, ext)
+            )
+        if cached is not None:
+            job.outputs, metadata = cached
+            job.stats["output_bytes"] = metadata.get("output_bytes")
+            job.stats["triangle_count"] = metadata.get("triangle_count")
+            job.mesh = metadata.get("mesh") or {}
+
+    async def convert(self):
+        while True:
+            job = await self.conversions.get()
+            try:
+                await self.convert_job(job)
+            except Exception as e:
+                await self.fail(job, e)
+                continue
+            finally:
+                self.release_slot(job)
+            await self.uploads.put(job)
+
+    async def convert_job(self, job: PipelineJob):
+        ensure_lease(job.id)
+        with job.timer.stage("convert"):
+            if job.local_input.lower().endswith(".stl"):
+                local_output = await asyncio.to_thread(engine_pool.call, normalize_stl, job.local_input)
+            else:
+                local_output = os.path.splitext(job.local_input)[0] + ".stl"
+                await asyncio.to_thread(engine_pool.convert, job.local_input, local_output)
+
+        job.stats["output_bytes"] = os.path.getsize(local_output)
+        triangles = binary_facet_count(local_output)
+        job.stats["triangle_count"] = triangles if triangles >= 0 else None
+
+        with job.timer.stage("stats"):
+            job.mesh = await asyncio.to_thread(measure_output, local_output)
+        with job.timer.stage("derive"):
+            derived = await asyncio.to_thread(derive_outputs, local_output)
+        job.local_outputs = dict(derived, full=local_output)
+
+    async def finish(self):
+        while True:
+            job = await self.uploads.get()
+            try:
+                await self.finish_job(job)
+            except Exception as e:
+                await self.fail(job, e)
+
+    async def upload_output(self, job: PipelineJob, name: str, local_path: str) -> str:
+        ext = os.path.splitext(local_path)[1].lower()
+        output_path = converted_path(job.user_id, job.id, name, ext)
+        try:
+            await self.storage.upload_file("cad-converted", output_path, local_path,
+                                           CONTENT_TYPES.get(ext, "application/octet-stream"))
+        except Exception as e:
+            raise Exception(f"Upload failed: {e}")
+        return output_path
+
+    async def finish_job(self, job: PipelineJob):
+        if job.outputs is None:
+            ensure_lease(job.id)
+            names = list(job.local_outputs)
+            with job.timer.stage("upload"):
+                paths = await asyncio.gather(*(self.upload_output(job, name, job.local_outputs[name]) for name in names))
+            job.outputs = dict(zip(names, paths))
+            BYTES.inc(sum(os.path.getsize(path) for path in job.local_outputs.values()), direction="upload")
+            with job.timer.stage("cache_store"):
+                await asyncio.to_thread(conversion_cache.store, job.key, job.outputs, job.stats["output_bytes"], {
+                    "output_bytes": job.stats["output_bytes"],
+                    "triangle_count": job.stats["triangle_count"],
+                    "mesh": job.mesh
+                })
+
+        if job.stats.get("triangle_count"):
+            TRIANGLES.inc(job.stats["triangle_count"])
+        ensure_lease(job.id)
+
+        with job.timer.stage("update_showcase"):
+            await self.rest.update("showcases", ready_showcase_fields(job.outputs, job.mesh), id=job.row["showcase_id"])
+        with job.timer.stage("update_job"):
+            await self.rest.update("jobs", {
+                "status": "complete",
+                "output_path": job.outputs["full"],
+                "finished_at": "now()",
+                "stage_timings": dict(job.timer.stages),
+                **job.stats
+            }, id=job.id, claimed_by=WORKER_ID)
+
+        JOBS.inc(status="complete")
+        JOB_LATENCY.observe(job.timer.elapsed())
+        print(f"[pipeline] job {job.id} completed in {job.timer.elapsed():.2f}s {job.timer.stages}")
+        self.done(job)
+
+    async def fail(self, job: PipelineJob, error: Exception):
+        self.release_slot(job)
+        try:
+            if isinstance(error, LeaseLost):
+                print(f"[pipeline] abandoning job {job.id}: {error}")
+                JOBS.inc(status="abandoned")
+                return
+
+            stage = job.timer.current or "other"
+            print(f"[pipeline] job {job.id} failed in {stage}: {error}")
+            JOBS.inc(status="failed")
+            ERRORS.inc(stage=stage)
+            JOB_LATENCY.observe(job.timer.elapsed())
+
+            # Only while this worker still owns the job
+            rows = await self.rest.update("jobs", {
+                "status": "failed",
+                "finished_at": "now()",
+                "error": str(error),
+                "stage_timings": dict(job.timer.stages),
+                **job.stats
+            }, id=job.id, claimed_by=WORKER_ID)
+            if rows:
+                await self.rest.update("showcases", {"status": "failed"}, id=job.row["showcase_id"])
+        except Exception as e:
+            print(f"[pipeline] could not record failure of job {job.id}: {e}")
+        finally:
+            self.done(job)
+
+    def done(self, job: PipelineJob):
+        """Forget the job's lease and remove its local files"""
+        with leases_lock:
+            leased_jobs.discard(job.id)
+            lost_leases.discard(job.id)
+        if job.local_input:
+            remove_job_files(job.local_input)
+
+    async def run(self):
+        tasks = [self.claim()]
+        tasks += [self.download() for _ in range(PIPELINE_TRANSFER_CONCURRENCY)]
+        tasks += [self.convert() for _ in range(WORKER_CONCURRENCY)]
+        tasks += [self.finish() for _ in range(PIPELINE_TRANSFER_CONCURRENCY)]
+        await asyncio.gather(*tasks)
+
+async def main():
+    # Conversions and derived outputs each hold a thread while an engine works,
+    # next to hashing, cache calls and the NOTIFY wait
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+        max_workers=WORKER_CONCURRENCY + 2 * PIPELINE_TRANSFER_CONCURRENCY + 2,
+        thread_name_prefix="pipeline",
+    ))
+    limits = httpx.Limits(max_connections=4 * PIPELINE_TRANSFER_CONCURRENCY + 8,
+                          max_keepalive_connections=2 * PIPELINE_TRANSFER_CONCURRENCY + 4)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0), limits=limits) as http:
+        await Pipeline(http).run()
+
+if __name__ == "__main__":
+    print("[pipeline] starting...")
+    print(f"[pipeline] Worker id: {WORKER_ID} ({WORKER_CONCURRENCY} engines, "
+          f"prefetch {PIPELINE_PREFETCH}, {PIPELINE_TRANSFER_CONCURRENCY} transfers per direction)")
+
+    # The lease heartbeat and the conversion cache use worker.py's clients
+    init_clients()
+    engine_pool.start()
+    threading.Thread(target=heartbeat_loop, name="lease-heartbeat", daemon=True).start()
+    start_metrics_server(METRICS_HOST, METRICS_PORT, cache_metrics)
+    start_listener(SUPABASE_DB_URL, wakeup, listener_connected)
+
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""Run convert_to_stl over a corpus and report per-file performance
+
+Each file is converted in a fresh process so wall time and peak RSS are
+isolated. The report is JSON: one entry per file with wall time, peak RSS,
+output triangles, triangles/sec and output bytes. Pass --baseline to compare
+against an earlier report; the exit status is 1 if any file regressed beyond
+the thresholds.
+
+Usage:
+  python benchmarks/bench_convert.py --corpus /tmp/corpus --out report.json
+  python benchmarks/bench_convert.py --corpus /tmp/corpus --baseline report.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _convert(input_path: str, output_path: str, queue):
+    from convert_to_stl import convert_to_stl
+    from stl_io import binary_facet_count
+
+    start = time.perf_counter()
+    try:
+        convert_to_stl(input_path, output_path)
+        error = None
+    except Exception as e:
+        error = str(e)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "seconds": elapsed,
+        "error": error,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "triangles": binary_facet_count(output_path) if error is None else None,
+        "output_bytes": os.path.getsize(output_path) if error is None else None,
+    })
+
+def bench_file(input_path: str, repeat: int) -> Dict[str, Any]:
+    """Best-of-`repeat` wall time and the peak RSS of that run"""
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_convert, args=(input_path, os.path.join(tmp, "out.stl"), queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                runs.append({"error": f"exit code {proc.exitcode}"})
+                break
+            runs.append(queue.get())
+
+    ok = [run for run in runs if not run.get("error")]
+    result = {"file": os.path.basename(input_path), "input_bytes": os.path.getsize(input_path)}
+    if not ok:
+        result["error"] = runs[-1]["error"]
+        return result
+
+    best = min(ok, key=lambda run: run["seconds"])
+    triangles = best["triangles"] if best["triangles"] is not None and best["triangles"] >= 0 else None
+    result.update({
+        "seconds": round(best["seconds"], 4),
+        "peak_rss_mb": round(best["peak_rss_mb"], 1),
+        "triangles": triangles,
+        "triangles_per_sec": round(triangles / best["seconds"]) if triangles and best["seconds"] > 0 else None,
+        "output_bytes": best["output_bytes"],
+    })
+    return result
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_slowdown: float,
+            max_rss_growth: float, min_seconds: float) -> List[str]:
+    """Regressions of `results` against a baseline report, as messages"""
+    before = {entry["file"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        old = before.get(entry["file"])
+        if old is None or old.get("error"):
+            continue
+        if entry.get("error"):
+            regressions.append(f"{entry['file']}: now fails ({entry['error']})")
+            continue
+        # Sub-threshold timings are mostly noise
+        if entry["seconds"] >= min_seconds and entry["seconds"] > old["seconds"] * max_slowdown:
+            regressions.append(f"{entry['file']}: {old['seconds']}s -> {entry['seconds']}s")
+        if entry["peak_rss_mb"] > old["peak_rss_mb"] * max_rss_growth:
+            regressions.append(f"{entry['file']}: peak RSS {old['peak_rss_mb']} MB -> {entry['peak_rss_mb']} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", required=True, help="directory from benchmarks/corpus.py")
+    parser.add_argument("--generate", choices=["small", "full"], help="(re)generate the corpus first")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--max-rss-growth", type=float, default=1.25)
+    parser.add_argument("--min-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.generate:
+        from corpus import generate
+        generate(args.corpus, args.generate)
+
+    files = sorted(
+        os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+        if name.lower().endswith((".stl", ".obj", ".step", ".stp"))
+    )
+
+    results = []
+    for path in files:
+        print(f"[bench] {os.path.basename(path)}", file=sys.stderr)
+        results.append(bench_file(path, args.repeat))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(results, baseline, args.max_slowdown, args.max_rss_growth, args.min_seconds)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for message in report.get("regressions", []):
+        print(f"[bench] REGRESSION {message}", file=sys.stderr)
+    sys.exit(1 if report.get("regressions") else 0)
+
+if __name__ == "__main__":
+    main()
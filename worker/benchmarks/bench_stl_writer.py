@@ -0,0 +1,94 @@
+"""Benchmark the NumPy binary STL writer against FreeCAD's Mesh route
+
+Both routes start from the same input shape.tessellate() returns (a list of
+vectors and a list of index tuples) and each runs in a fresh process so peak
+RSS is comparable. The Mesh route is skipped when FreeCAD isn't importable.
+
+Usage: python benchmarks/bench_stl_writer.py [triangles ...]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _Vec:
+    """Stand-in for FreeCAD.Vector when FreeCAD isn't available"""
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+def synthetic_tessellation(triangles: int, vector=_Vec):
+    """A wavy grid with roughly `triangles` facets, shaped like tessellate() output"""
+    import math
+    k = max(1, int(math.sqrt(triangles / 2)))
+    points = [vector(i, j, math.sin(i * 0.1) * math.cos(j * 0.1)) for i in range(k + 1) for j in range(k + 1)]
+    tris = []
+    for i in range(k):
+        for j in range(k):
+            a = i * (k + 1) + j
+            b, c, d = a + 1, a + k + 1, a + k + 2
+            tris.append((a, c, b))
+            tris.append((b, c, d))
+    return points, tris
+
+def _run(route: str, triangles: int, out_path: str, queue):
+    if route == "mesh":
+        import FreeCAD
+        import Mesh
+        tessellation = synthetic_tessellation(triangles, FreeCAD.Vector)
+    else:
+        tessellation = synthetic_tessellation(triangles)
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if route == "mesh":
+        mesh = Mesh.Mesh()
+        mesh.addFacets(tessellation)
+        mesh.write(out_path)
+    else:
+        from stl_io import tessellation_to_arrays, write_binary_stl
+        write_binary_stl(out_path, *tessellation_to_arrays(tessellation))
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queue.put({
+        "route": route,
+        "triangles": len(tessellation[1]),
+        "seconds": round(elapsed, 4),
+        "extra_peak_rss_mb": round((peak_rss - base_rss) / 1024, 1),
+        "output_bytes": os.path.getsize(out_path),
+    })
+
+def bench(route: str, triangles: int):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = ctx.Process(target=_run, args=(route, triangles, os.path.join(tmp, "out.stl"), queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            return {"route": route, "triangles": triangles, "error": f"exit code {proc.exitcode}"}
+        return queue.get()
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000, 1_000_000, 4_000_000]
+
+    routes = ["numpy"]
+    try:
+        import FreeCAD  # noqa: F401
+        routes.append("mesh")
+    except ImportError:
+        print("[bench] FreeCAD not available, skipping the Mesh route", file=sys.stderr)
+
+    for triangles in sizes:
+        for route in routes:
+            print(json.dumps(bench(route, triangles)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Regression check for the native OBJ reader (obj_io.obj_to_binary_stl)
+
+Writes random OBJ files that mix degenerate 1- and 2-corner faces with
+triangles, quads and larger polygons, positive and negative indices, v/vt/vn
+corner syntax and faces that refer to vertices further down the file, then
+compares every facet the reader writes against a plain-Python fan
+triangulation of the same file. Each file is read with the normal buffer and
+with a tiny one, so faces and vertices also straddle read boundaries.
+
+Exits non-zero on the first mismatch.
+
+Usage: python benchmarks/check_obj_io.py [--files 20] [--seed 0]
+"""
+import os
+import sys
+import random
+import argparse
+import tempfile
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import obj_io
+from stl_io import read_binary_stl
+
+def random_obj(rng: random.Random, vertices: int, faces: int) -> str:
+    """OBJ text with vertex blocks and face blocks interleaved"""
+    lines = ["# obj_io regression case"]
+    defined = 0
+    while defined < vertices or faces > 0:
+        for _ in range(min(rng.randint(1, 8), vertices - defined)):
+            x, y, z = (rng.uniform(-100, 100) for _ in range(3))
+            lines.append(f"v {x:.6f} {y:.6f} {z:.6f}")
+            defined += 1
+        for _ in range(min(rng.randint(0, 6), faces)):
+            faces -= 1
+            corners = []
+            for _ in range(rng.choice([1, 2, 3, 3, 4, 4, 5, 6])):
+                if defined and rng.random() < 0.4:
+                    # Negative: counts back from the vertices read so far
+                    token = str(-rng.randint(1, defined))
+                else:
+                    # Positive, possibly a vertex defined later in the file
+                    token = str(rng.randint(1, vertices))
+                token += rng.choice(["", "/1", "/1/1", "//1"])
+                corners.append(token)
+            lines.append("f" + rng.choice([" ", "\t"]) + " ".join(corners))
+    # At least one real triangle, or the reader rightly rejects the file
+    lines.append("f 1 2 3")
+    return "\n".join(lines) + "\n"
+
+def reference_triangles(text: str) -> Tuple[np.ndarray, List[Tuple[int, int, int]]]:
+    """Vertices and fan triangles, one OBJ line at a time"""
+    points: List[List[float]] = []
+    triangles: List[Tuple[int, int, int]] = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "v":
+            points.append([float(value) for value in fields[1:4]])
+        elif fields[0] == "f":
+            corners = []
+            for token in fields[1:]:
+                index = int(token.split("/")[0])
+                corners.append(index - 1 if index > 0 else len(points) + index)
+            for j in range(1, len(corners) - 1):
+                triangles.append((corners[0], corners[j], corners[j + 1]))
+    return np.array(points, dtype=np.float32), triangles
+
+def check(path: str, read_size: int) -> int:
+    with open(path) as f:
+        points, triangles = reference_triangles(f.read())
+    expected = points[np.array(triangles)]
+
+    out = path + ".stl"
+    saved, obj_io.ASCII_READ_SIZE = obj_io.ASCII_READ_SIZE, read_size
+    try:
+        count = obj_io.obj_to_binary_stl(path, out)
+    finally:
+        obj_io.ASCII_READ_SIZE = saved
+
+    # Batches are written in file order except for deferred (forward
+    # referencing) faces, so compare sorted facets
+    written = np.array(read_binary_stl(out)["vertices"]).reshape(-1, 9)
+    os.remove(out)
+    expected = expected.reshape(-1, 9)
+    if count != len(expected):
+        raise AssertionError(f"{path}: {count} facets written, {len(expected)} expected")
+    in_order = lambda facets: facets[np.lexsort(facets.T[::-1])]
+    if not np.array_equal(in_order(written), in_order(expected)):
+        raise AssertionError(f"{path} (read size {read_size}): facets differ from the reference triangulation")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="obj_io_") as tmp:
+        for i in range(args.files):
+            path = os.path.join(tmp, f"case_{i}.obj")
+            with open(path, "w") as f:
+                f.write(random_obj(rng, rng.randint(3, 200), rng.randint(1, 300)))
+            for read_size in (obj_io.ASCII_READ_SIZE, 64):
+                try:
+                    count = check(path, read_size)
+                except AssertionError as e:
+                    print(f"[check] FAIL {e}")
+                    sys.exit(1)
+            print(f"[check] case_{i}: {count} facets match")
+    print(f"[check] {args.files} files OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Generate a synthetic CAD corpus for the conversion benchmarks
+
+Meshes (binary/ASCII STL, OBJ) are generated with NumPy; STEP files need
+FreeCAD and are skipped without it. Every file name encodes its case, so the
+benchmark reports stay comparable between runs.
+
+Usage: python benchmarks/corpus.py <output_dir> [--scale small|full]
+"""
+import os
+import sys
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stl_io import write_binary_stl
+
+# (name, sphere rings) per scale; a sphere with k rings has 4 * k^2 triangles
+MESH_CASES = {
+    "small": [("tiny", 8), ("medium", 100)],
+    "full": [("tiny", 8), ("medium", 100), ("dense", 500), ("huge", 1000)],
+}
+ASSEMBLY_CASES = {
+    "small": [("assembly_4", 2), ("assembly_16", 4)],
+    "full": [("assembly_4", 2), ("assembly_64", 8), ("assembly_400", 20)],
+}
+
+def uv_sphere(rings: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indexed UV sphere with `rings` latitude bands and 2 * rings longitudes"""
+    theta, phi = np.meshgrid(
+        np.linspace(0, np.pi, rings + 1),
+        np.linspace(0, 2 * np.pi, 2 * rings + 1),
+        indexing="ij",
+    )
+    points = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1)
+    grid = np.arange(points.shape[0] * points.shape[1]).reshape(points.shape[:2])
+    a, b = grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel()
+    c, d = grid[1:, :-1].ravel(), grid[1:, 1:].ravel()
+    return points.reshape(-1, 3) * 50.0, np.concatenate([np.stack([a, c, b], 1), np.stack([b, c, d], 1)])
+
+def write_ascii_stl(path: str, points: np.ndarray, triangles: np.ndarray):
+    vertices = points[triangles]
+    with open(path, "w") as f:
+        f.write("solid synthetic\n")
+        for tri in vertices:
+            f.write("  facet normal 0 0 0\n    outer loop\n")
+            for v in tri:
+                f.write(f"      vertex {v[0]:.6e} {v[1]:.6e} {v[2]:.6e}\n")
+            f.write("    endloop\n  endfacet\n")
+        f.write("endsolid synthetic\n")
+
+def write_obj(path: str, points: np.ndarray, triangles: np.ndarray, quads: bool = False, negative: bool = False):
+    """OBJ with triangle faces, or quads where two triangles share an edge pair"""
+    with open(path, "w") as f:
+        f.write("# synthetic corpus\n")
+        for p in points:
+            f.write(f"v {p[0]:.6f} {p[1]:.6f} {p[2]:.6f}\n")
+        n = len(points)
+        index = (lambda i: i - n) if negative else (lambda i: i + 1)
+        if quads and len(triangles) % 2 == 0:
+            half = len(triangles) // 2
+            for (a, c, b), (_, _, d) in zip(triangles[:half], triangles[half:]):
+                f.write(f"f {index(a)} {index(c)} {index(d)} {index(b)}\n")
+        else:
+            for a, b, c in triangles:
+                f.write(f"f {index(a)} {index(b)} {index(c)}\n")
+
+def write_step_cases(out_dir: str, scale: str) -> List[str]:
+    try:
+        import Part
+        import FreeCAD
+    except ImportError:
+        print("[corpus] FreeCAD not available, skipping STEP cases", file=sys.stderr)
+        return []
+
+    paths = []
+    box = Part.makeBox(100, 60, 20)
+    cylinder = Part.makeCylinder(25, 80)
+    filleted = box.makeFillet(5, box.Edges)
+    for name, shape in [("box", box), ("cylinder", cylinder), ("filleted_box", filleted)]:
+        path = os.path.join(out_dir, f"step_{name}.step")
+        shape.exportStep(path)
+        paths.append(path)
+
+    for name, side in ASSEMBLY_CASES[scale]:
+        solids = []
+        for i in range(side):
+            for j in range(side):
+                body = Part.makeCylinder(8, 30, FreeCAD.Vector(i * 40, j * 40, 0))
+                solids.append(body.fuse(Part.makeBox(20, 20, 5, FreeCAD.Vector(i * 40 - 10, j * 40 - 10, 0))))
+        path = os.path.join(out_dir, f"step_{name}.step")
+        Part.makeCompound(solids).exportStep(path)
+        paths.append(path)
+
+    return paths
+
+def generate(out_dir: str, scale: str = "small") -> List[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    for name, rings in MESH_CASES[scale]:
+        points, triangles = uv_sphere(rings)
+
+        path = os.path.join(out_dir, f"stl_binary_{name}.stl")
+        write_binary_stl(path, points, triangles)
+        paths.append(path)
+
+        # Text formats get slow to generate (and pointless) for the biggest meshes
+        if len(triangles) <= 1_000_000:
+            path = os.path.join(out_dir, f"stl_ascii_{name}.stl")
+            write_ascii_stl(path, points, triangles)
+            paths.append(path)
+
+            path = os.path.join(out_dir, f"obj_tri_{name}.obj")
+            write_obj(path, points, triangles)
+            paths.append(path)
+
+            path = os.path.join(out_dir, f"obj_quad_negative_{name}.obj")
+            write_obj(path, points, triangles, quads=True, negative=True)
+            paths.append(path)
+
+    paths.extend(write_step_cases(out_dir, scale))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--scale", choices=sorted(MESH_CASES), default="small")
+    args = parser.parse_args()
+
+    for path in generate(args.out_dir, args.scale):
+        print(f"{os.path.getsize(path):>12}  {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Load-test the worker end to end against an in-process Supabase stand-in
+
+Enqueues synthetic STL/OBJ jobs (UV spheres of several sizes, spread over a
+number of users) into the stand-in's tables and buckets, then runs the real
+worker.py loop -- poll_once, process_job, engine pool, lease heartbeat,
+conversion cache -- until every job has finished. The report is JSON:
+sustained jobs/min, queue-wait and processing-time percentiles, mean stage
+timings, and CPU / RSS of the whole process tree (worker plus engines).
+
+Worker settings come from the environment as usual (WORKER_CONCURRENCY,
+JOB_FAIR_SHARE_SECONDS, ...); worker log lines go to --log.
+
+Usage:
+  python benchmarks/load_test.py --jobs 2000 --users 20 --concurrency 8
+  python benchmarks/load_test.py --jobs 500 --arrival-rate 5 --db-latency-ms 20 --out load.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import threading
+from glob import glob
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import uv_sphere, write_obj
+from standin import SupabaseStandIn
+from stl_io import HEADER_SIZE, write_binary_stl
+
+TERMINAL = ("complete", "failed")
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    """Nearest-rank p50/p90/p95/p99 plus mean and max"""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": round(sum(values) / len(values), 4), "max": round(values[-1], 4)}
+    for p in (50, 90, 95, 99):
+        summary[f"p{p}"] = round(values[max(math.ceil(p / 100 * len(values)) - 1, 0)], 4)
+    return summary
+
+def make_templates(out_dir: str, rings: List[int], formats: List[str]) -> List[Dict[str, Any]]:
+    """One sphere per (size, format) to derive every job's input from"""
+    templates = []
+    for n in rings:
+        points, triangles = uv_sphere(n)
+        for fmt in formats:
+            path = os.path.join(out_dir, f"sphere_{n}.{fmt}")
+            if fmt == "stl":
+                write_binary_stl(path, points, triangles)
+            else:
+                write_obj(path, points, triangles)
+            with open(path, "rb") as f:
+                templates.append({"format": fmt, "triangles": len(triangles), "data": f.read()})
+    return templates
+
+def unique_input(template: Dict[str, Any], tag: str) -> bytes:
+    """Template bytes made distinct per job, so the conversion cache misses"""
+    if template["format"] == "stl":
+        header = f"load test {tag}".encode()[:HEADER_SIZE].ljust(HEADER_SIZE, b"\0")
+        return header + template["data"][HEADER_SIZE:]
+    return f"# load test {tag}\n".encode() + template["data"]
+
+class Sampler(threading.Thread):
+    """CPU and RSS of this process tree (worker threads plus engines) once a second"""
+
+    def __init__(self, interval: float = 1.0):
+        super().__init__(name="load-sampler", daemon=True)
+        from engine import tree_usage
+        self.tree_usage = tree_usage
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.rss: List[int] = []
+        self.cpu_start = tree_usage(os.getpid())[1]
+        self.cpu = 0.0
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        rss, cpu = self.tree_usage(os.getpid())
+        self.rss.append(rss)
+        self.cpu = cpu - self.cpu_start
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sample()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, help="WORKER_CONCURRENCY (default: the environment's, else all cores)")
+    parser.add_argument("--rings", default="8,24,64", help="sphere sizes (4 * rings^2 triangles), picked at random")
+    parser.add_argument("--formats", default="stl,obj")
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="fraction of jobs reusing an earlier job's exact input (conversion cache hits)")
+    parser.add_argument("--arrival-rate", type=float, default=0.0,
+                        help="jobs enqueued per second (0 queues them all up front)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="added to every table/RPC call")
+    parser.add_argument("--storage-latency-ms", type=float, default=0.0, help="added to every storage request")
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "load_test_worker.log"))
+    parser.add_argument("--out", help="also write the report here")
+    args = parser.parse_args()
+
+    if args.concurrency:
+        os.environ["WORKER_CONCURRENCY"] = str(args.concurrency)
+    # Placeholders only: every request goes to the stand-in
+    os.environ.setdefault("SUPABASE_URL", "http://standin")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin")
+    os.environ.setdefault("POLL_INTERVAL_SECONDS", "0.2")
+    os.environ.setdefault("POLL_MAX_INTERVAL_SECONDS", "1")
+
+    # Worker and engine output (the engines inherit the descriptors) goes to the log
+    report_out = os.fdopen(os.dup(1), "w")
+    log = open(args.log, "w")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+
+    import httpx
+    import worker
+    from storage import StorageClient
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory(prefix="load_test_") as tmp:
+        standin = SupabaseStandIn(
+            os.path.join(tmp, "storage"),
+            db_latency=args.db_latency_ms / 1000,
+            storage_latency=args.storage_latency_ms / 1000,
+            on_enqueue=worker.wakeup.set,
+        )
+        worker.init_clients(standin, StorageClient(
+            worker.SUPABASE_URL, worker.SUPABASE_SERVICE_ROLE_KEY, httpx.Client(transport=standin.transport()),
+        ))
+
+        templates = make_templates(tmp, [int(r) for r in args.rings.split(",")], args.formats.split(","))
+        users = [f"{random.getrandbits(128):032x}" for _ in range(args.users)]
+        inputs: List[tuple] = []
+
+        def enqueue(i: int):
+            user = random.choice(users)
+            if inputs and random.random() < args.duplicates:
+                template, tag = random.choice(inputs)
+            else:
+                template, tag = random.choice(templates), str(i)
+                inputs.append((template, tag))
+            data = unique_input(template, tag)
+            path = f"{user}/job_{i}.{template['format']}"
+            standin.put_object("cad-uploaded", path, data)
+            standin.create_showcase_and_job(user, f"load test {i}", path, len(data))
+
+        worker.engine_pool.start()
+        threading.Thread(target=worker.heartbeat_loop, name="lease-heartbeat", daemon=True).start()
+        stop = threading.Event()
+        poller = threading.Thread(target=worker.run, args=(stop,), name="poller", daemon=True)
+        sampler = Sampler()
+
+        started = time.time()
+        sampler.start()
+        if args.arrival_rate <= 0:
+            for i in range(args.jobs):
+                enqueue(i)
+        poller.start()
+        for i in range(args.jobs if args.arrival_rate > 0 else 0):
+            time.sleep(max(started + i / args.arrival_rate - time.time(), 0))
+            enqueue(i)
+
+        # Wait for every job to reach a terminal status, deleting the objects
+        # of finished ones so disk use stays bounded by the conversion cache
+        cleaned: Set[str] = set()
+        while time.time() - started < args.timeout:
+            with standin.lock:
+                finished = [(job["id"], job["user_id"], job["input_path"]) for job in standin.tables["jobs"].values()
+                            if job["status"] in TERMINAL and job["id"] not in cleaned]
+            for job_id, user, input_path in finished:
+                standin.remove_object("cad-uploaded", input_path)
+                for path in glob(standin.object_path("cad-converted", f"{user}/{job_id}*")):
+                    os.remove(path)
+                cleaned.add(job_id)
+            if len(cleaned) >= args.jobs:
+                break
+            time.sleep(0.25)
+
+        stop.set()
+        worker.wakeup.set()
+        poller.join()
+        worker.job_executor.shutdown(wait=True)
+        sampler.stop()
+        worker.engine_pool.close()
+        elapsed = time.time() - started
+
+        jobs = list(standin.tables["jobs"].values())
+        report = build_report(args, jobs, elapsed, sampler, worker, standin)
+
+    sys.stdout.flush()
+    log.close()
+    text = json.dumps(report, indent=2)
+    print(text, file=report_out)
+    report_out.flush()
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+def build_report(args, jobs: List[Dict[str, Any]], elapsed: float, sampler: Sampler, worker, standin) -> Dict[str, Any]:
+    def ts(value: str) -> float:
+        return datetime.fromisoformat(value).timestamp()
+
+    complete = [job for job in jobs if job["status"] == "complete"]
+    failed = [job for job in jobs if job["status"] == "failed"]
+    finished = sorted(ts(job["finished_at"]) for job in complete + failed if job.get("finished_at"))
+    first_created = min(ts(job["created_at"]) for job in jobs) if jobs else 0.0
+
+    # Sustained rate: the middle 80% of completions, without ramp-up and drain
+    sustained = None
+    if len(finished) >= 10:
+        lo, hi = int(len(finished) * 0.1), int(len(finished) * 0.9) - 1
+        if finished[hi] > finished[lo]:
+            sustained = round((hi - lo) / (finished[hi] - finished[lo]) * 60, 2)
+
+    stages: Dict[str, List[float]] = {}
+    for job in complete:
+        for name, seconds in (job.get("stage_timings") or {}).items():
+            stages.setdefault(name, []).append(seconds)
+
+    errors: Dict[str, int] = {}
+    for job in failed:
+        errors[job.get("error") or ""] = errors.get(job.get("error") or "", 0) + 1
+
+    cores = os.cpu_count() or 1
+    return {
+        "config": {
+            "jobs": args.jobs,
+            "users": args.users,
+            "concurrency": worker.WORKER_CONCURRENCY,
+            "rings": args.rings,
+            "formats": args.formats,
+            "duplicates": args.duplicates,
+            "arrival_rate": args.arrival_rate,
+            "db_latency_ms": args.db_latency_ms,
+            "storage_latency_ms": args.storage_latency_ms,
+            "fair_share_seconds": worker.JOB_FAIR_SHARE_SECONDS,
+            "cache_max_entries": worker.CONVERSION_CACHE_MAX_ENTRIES,
+        },
+        "jobs": {
+            "complete": len(complete),
+            "failed": len(failed),
+            "unfinished": len(jobs) - len(complete) - len(failed),
+            "errors": dict(sorted(errors.items(), key=lambda item: -item[1])[:5]),
+        },
+        "seconds": round(elapsed, 3),
+        "jobs_per_minute": {
+            "overall": round(len(finished) / (finished[-1] - first_created) * 60, 2) if finished else None,
+            "sustained": sustained,
+        },
+        "queue_wait_seconds": percentiles([job["stage_timings"]["queue_wait"] for job in complete + failed
+                                           if "queue_wait" in (job.get("stage_timings") or {})]),
+        "processing_seconds": percentiles([ts(job["finished_at"]) - ts(job["started_at"]) for job in complete]),
+        "stage_mean_seconds": {name: round(sum(v) / len(v), 4) for name, v in sorted(stages.items())},
+        "resources": {
+            "cores": cores,
+            "cpu_seconds": round(sampler.cpu, 2),
+            "cpu_utilization": round(sampler.cpu / elapsed / cores, 3) if elapsed else None,
+            "peak_rss_mb": round(max(sampler.rss, default=0) / 2 ** 20, 1),
+            "mean_rss_mb": round(sum(sampler.rss) / len(sampler.rss) / 2 ** 20, 1) if sampler.rss else None,
+        },
+        "cache": worker.conversion_cache.summary(),
+        "standin_calls": dict(sorted(standin.calls.items())),
+    }
+
+if __name__ == "__main__":
+    main()
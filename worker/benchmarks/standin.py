@@ -0,0 +1,400 @@
+"""In-process stand-in for the Supabase project the worker talks to
+
+SupabaseStandIn mimics the slice of supabase-py the worker uses: the jobs,
+showcases and conversion_cache tables (select/insert/update/upsert/delete
+with eq/in_/order/range/limit), the claim_jobs and renew_job_leases RPCs
+(same fair-share ordering and lease rules as docs/rpc_create_showcase.sql)
+and storage copy/remove. Objects live under a local directory, and
+`transport()` serves them to StorageClient through an httpx.MockTransport,
+including the resumable (TUS) upload endpoint.
+
+Optional per-call latencies emulate the round trip to a real project.
+"""
+import os
+import time
+import base64
+import heapq
+import shutil
+import bisect
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import unquote
+
+import httpx
+
+PRIMARY_KEYS = {"jobs": "id", "showcases": "id", "conversion_cache": "key"}
+# Rough seconds of work per MB of input, as in claim_jobs
+FORMAT_COST = {"stl": 0.2, "obj": 1, "step": 5, "stp": 5}
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+class _Query:
+    """One PostgREST-style request against a stand-in table"""
+
+    def __init__(self, db: "SupabaseStandIn", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.values: Any = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.pk_value: Any = None
+        self.order_by: Optional[tuple] = None
+        self.offset = 0
+        self.count: Optional[int] = None
+
+    def select(self, columns: str = "*", **_):
+        self.columns = columns
+        return self
+
+    def insert(self, values):
+        self.action, self.values = "insert", values
+        return self
+
+    def upsert(self, values):
+        self.action, self.values = "upsert", values
+        return self
+
+    def update(self, values: Dict[str, Any]):
+        self.action, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        if column == PRIMARY_KEYS[self.table] and self.pk_value is None:
+            self.pk_value = value
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by = (column, desc)
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.count = start, end - start + 1
+        return self
+
+    def limit(self, count: int):
+        self.count = count
+        return self
+
+    def execute(self):
+        self.db.delay(self.db.db_latency)
+        with self.db.lock:
+            return SimpleNamespace(data=self.db.run_query(self), count=None)
+
+class _Bucket:
+    def __init__(self, db: "SupabaseStandIn", bucket: str):
+        self.db = db
+        self.bucket = bucket
+
+    def copy(self, from_path: str, to_path: str):
+        """Like Storage: errors out on a missing source and never overwrites"""
+        self.db.delay(self.db.storage_latency)
+        src = self.db.object_path(self.bucket, from_path)
+        if not os.path.exists(src):
+            raise Exception({"statusCode": 400, "error": "not_found", "message": "Object not found"})
+        dst = self.db.object_path(self.bucket, to_path)
+        if os.path.exists(dst):
+            raise Exception({"statusCode": 400, "error": "Duplicate", "message": "The resource already exists"})
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(src, dst)
+        return {"message": "Successfully copied"}
+
+    def remove(self, paths: List[str]):
+        self.db.delay(self.db.storage_latency)
+        for path in paths:
+            self.db.remove_object(self.bucket, path)
+        return []
+
+class SupabaseStandIn:
+    """Tables, RPCs and storage of one fake Supabase project (thread-safe)"""
+
+    def __init__(self, root: str, db_latency: float = 0.0, storage_latency: float = 0.0,
+                 on_enqueue: Optional[Callable[[], None]] = None):
+        self.root = root
+        self.db_latency = db_latency
+        self.storage_latency = storage_latency
+        # Called for every queued job, like the jobs_queued NOTIFY trigger
+        self.on_enqueue = on_enqueue
+        self.lock = threading.RLock()
+        self.tables: Dict[str, Dict[Any, Dict[str, Any]]] = {name: {} for name in PRIMARY_KEYS}
+        # Queued jobs per user ordered by created_at, and running jobs per user,
+        # kept in step with every status change so claims never scan the table
+        self.queued: Dict[Any, List[tuple]] = defaultdict(list)
+        self.running: Dict[Any, int] = defaultdict(int)
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.storage = SimpleNamespace(from_=lambda bucket: _Bucket(self, bucket))
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def delay(seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # -- supabase-py surface -------------------------------------------------
+
+    def table(self, name: str) -> _Query:
+        self.calls[f"table:{name}"] += 1
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]):
+        self.calls[f"rpc:{name}"] += 1
+        handler = {"claim_jobs": self._claim_jobs, "renew_job_leases": self._renew_job_leases}[name]
+
+        def execute():
+            self.delay(self.db_latency)
+            with self.lock:
+                return SimpleNamespace(data=handler(**params), count=None)
+        return SimpleNamespace(execute=execute)
+
+    # -- tables --------------------------------------------------------------
+
+    def run_query(self, q: _Query) -> List[Dict[str, Any]]:
+        table = self.tables[q.table]
+        pk = PRIMARY_KEYS[q.table]
+
+        if q.action in ("insert", "upsert"):
+            rows = q.values if isinstance(q.values, list) else [q.values]
+            stored = []
+            for values in rows:
+                values = self._resolve(values)
+                existing = table.get(values.get(pk))
+                if existing is not None and q.action == "upsert":
+                    self._set(q.table, existing, values)
+                    stored.append(dict(existing))
+                else:
+                    row = dict(values)
+                    table[row[pk]] = row
+                    self._index(q.table, row, None)
+                    stored.append(dict(row))
+            return stored
+
+        if q.pk_value is not None:
+            candidates = [table[q.pk_value]] if q.pk_value in table else []
+        else:
+            candidates = list(table.values())
+        rows = [row for row in candidates if all(f(row) for f in q.filters)]
+
+        if q.action == "update":
+            values = self._resolve(q.values)
+            for row in rows:
+                self._set(q.table, row, values)
+            return [dict(row) for row in rows]
+
+        if q.action == "delete":
+            for row in rows:
+                del table[row[pk]]
+            return [dict(row) for row in rows]
+
+        if q.columns.strip() == "count":
+            return [{"count": len(rows)}]
+        if q.order_by:
+            column, desc = q.order_by
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse=desc)
+        rows = rows[q.offset:q.offset + q.count if q.count is not None else None]
+        if q.columns.strip() != "*":
+            names = [c.strip() for c in q.columns.split(",")]
+            return [{name: row.get(name) for name in names} for row in rows]
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _resolve(values: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: now_iso() if v == "now()" else v for k, v in values.items()}
+
+    def _set(self, table: str, row: Dict[str, Any], values: Dict[str, Any]):
+        old_status = row.get("status")
+        row.update(values)
+        if table == "jobs" and row.get("status") != old_status:
+            self._index(table, row, old_status)
+
+    def _index(self, table: str, row: Dict[str, Any], old_status: Optional[str]):
+        if table != "jobs":
+            return
+        user = row.get("user_id")
+        if old_status == "queued":
+            queue = self.queued[user]
+            queue.pop(queue.index((row["created_at"], row["id"])))
+        elif old_status == "running":
+            self.running[user] -= 1
+        if row.get("status") == "queued":
+            bisect.insort(self.queued[user], (row["created_at"], row["id"]))
+            if self.on_enqueue:
+                self.on_enqueue()
+        elif row.get("status") == "running":
+            self.running[user] += 1
+
+    # -- RPCs ----------------------------------------------------------------
+
+    def create_showcase_and_job(self, user_id: str, title: str, input_path: str,
+                                input_bytes: Optional[int] = None) -> str:
+        """What the upload form's RPC inserts: an uploaded showcase and its queued job"""
+        showcase_id = os.urandom(16).hex()
+        ext = os.path.splitext(input_path)[1].lower().lstrip(".") or None
+        created = now_iso()
+        with self.lock:
+            self.run_query(_Query(self, "showcases").insert({
+                "id": showcase_id, "user_id": user_id, "title": title, "input_path": input_path,
+                "status": "uploaded", "created_at": created,
+            }))
+            self.run_query(_Query(self, "jobs").insert({
+                "id": os.urandom(16).hex(), "showcase_id": showcase_id, "user_id": user_id,
+                "input_path": input_path, "input_bytes": input_bytes, "input_format": ext,
+                "status": "queued", "attempt_count": 0, "claimed_by": None, "lease_expires_at": None,
+                "started_at": None, "finished_at": None, "error": None, "created_at": created,
+            }))
+        return showcase_id
+
+    def _claim_jobs(self, p_worker_id: str, p_limit: int = 1, p_lease_seconds: int = 120,
+                    p_max_attempts: int = 3, p_fair_share_seconds: int = 60,
+                    p_max_cost_penalty: int = 600) -> List[Dict[str, Any]]:
+        jobs = self.tables["jobs"]
+        now = datetime.now(timezone.utc)
+
+        for row in [r for r in jobs.values() if r["status"] == "running"]:
+            lease = row.get("lease_expires_at")
+            expires = _timestamp(lease) if lease else _timestamp(row["started_at"]) + p_lease_seconds
+            if expires >= now.timestamp():
+                continue
+            if row["attempt_count"] >= p_max_attempts:
+                self._set("jobs", row, {
+                    "status": "failed", "finished_at": now.isoformat(), "claimed_by": None, "lease_expires_at": None,
+                    "error": f"Lease expired on {row['claimed_by']} after {row['attempt_count']} attempt(s)",
+                })
+                self.tables["showcases"][row["showcase_id"]]["status"] = "failed"
+            else:
+                self._set("jobs", row, {"status": "queued", "claimed_by": None, "lease_expires_at": None})
+
+        if p_limit <= 0:
+            return []
+
+        # A job further back in a user's queue than this can't beat the front
+        # one (its fair-share offset already exceeds any cost difference)
+        depth = None if p_fair_share_seconds <= 0 \
+            else int(p_max_cost_penalty // p_fair_share_seconds) + p_limit + 1
+        candidates = []
+        for user, queue in self.queued.items():
+            for rank, (created, job_id) in enumerate(queue[:depth]):
+                job = jobs[job_id]
+                mb = (job.get("input_bytes") if job.get("input_bytes") is not None else 5 * 1024 * 1024) / 1048576
+                cost = min(mb * FORMAT_COST.get(job.get("input_format"), 2), p_max_cost_penalty)
+                candidates.append((_timestamp(created) + (rank + self.running[user]) * p_fair_share_seconds + cost, job_id))
+
+        claimed = []
+        for _, job_id in heapq.nsmallest(p_limit, candidates):
+            row = jobs[job_id]
+            self._set("jobs", row, {
+                "status": "running",
+                "started_at": now.isoformat(),
+                "claimed_by": p_worker_id,
+                "attempt_count": row["attempt_count"] + 1,
+                "lease_expires_at": (now + timedelta(seconds=p_lease_seconds)).isoformat(),
+            })
+            claimed.append(dict(row))
+        return claimed
+
+    def _renew_job_leases(self, p_worker_id: str, p_job_ids: List[str], p_lease_seconds: int = 120) -> List[str]:
+        expires = (datetime.now(timezone.utc) + timedelta(seconds=p_lease_seconds)).isoformat()
+        renewed = []
+        for job_id in p_job_ids:
+            row = self.tables["jobs"].get(job_id)
+            if row and row["status"] == "running" and row["claimed_by"] == p_worker_id:
+                row["lease_expires_at"] = expires
+                renewed.append(job_id)
+        return renewed
+
+    # -- storage -------------------------------------------------------------
+
+    def object_path(self, bucket: str, path: str) -> str:
+        return os.path.join(self.root, bucket, path)
+
+    def put_object(self, bucket: str, path: str, data: bytes):
+        """Place an object in a bucket (as the browser upload would)"""
+        dst = self.object_path(bucket, path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, "wb") as f:
+            f.write(data)
+
+    def remove_object(self, bucket: str, path: str):
+        try:
+            os.remove(self.object_path(bucket, path))
+        except FileNotFoundError:
+            pass
+
+    def transport(self) -> httpx.MockTransport:
+        """httpx transport serving /storage/v1 object and resumable-upload requests"""
+        return httpx.MockTransport(self._handle_storage)
+
+    def _handle_storage(self, request: httpx.Request) -> httpx.Response:
+        self.delay(self.storage_latency)
+        path = unquote(request.url.path)
+        self.calls[f"storage:{request.method}"] += 1
+
+        if path.startswith("/storage/v1/object/"):
+            bucket, _, name = path[len("/storage/v1/object/"):].partition("/")
+            target = self.object_path(bucket, name)
+            if request.method == "GET":
+                if not os.path.exists(target):
+                    return httpx.Response(404, json={"error": "not_found", "message": "Object not found"})
+                with open(target, "rb") as f:
+                    return httpx.Response(200, content=f.read())
+            if request.method == "POST":
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    for chunk in request.stream:
+                        f.write(chunk)
+                return httpx.Response(200, json={"Key": f"{bucket}/{name}"})
+
+        if path == "/storage/v1/upload/resumable" and request.method == "POST":
+            upload_id = os.urandom(8).hex()
+            metadata = dict(
+                (field.split(" ")[0], base64.b64decode(field.split(" ")[1]).decode())
+                for field in request.headers["Upload-Metadata"].split(",")
+            )
+            os.makedirs(os.path.join(self.root, ".uploads"), exist_ok=True)
+            with self.lock:
+                self.uploads[upload_id] = {
+                    "length": int(request.headers["Upload-Length"]),
+                    "bucket": metadata["bucketName"],
+                    "name": metadata["objectName"],
+                    "part": os.path.join(self.root, ".uploads", upload_id),
+                    "offset": 0,
+                }
+            open(self.uploads[upload_id]["part"], "wb").close()
+            return httpx.Response(201, headers={"Location": f"http://standin/storage/v1/upload/resumable/{upload_id}"})
+
+        if path.startswith("/storage/v1/upload/resumable/"):
+            upload = self.uploads.get(path.rsplit("/", 1)[1])
+            if upload is None:
+                return httpx.Response(404)
+            if request.method == "HEAD":
+                return httpx.Response(200, headers={"Upload-Offset": str(upload["offset"])})
+            if request.method == "PATCH":
+                if int(request.headers["Upload-Offset"]) != upload["offset"]:
+                    return httpx.Response(409)
+                body = request.read()
+                with open(upload["part"], "ab") as f:
+                    f.write(body)
+                upload["offset"] += len(body)
+                if upload["offset"] >= upload["length"]:
+                    target = self.object_path(upload["bucket"], upload["name"])
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(upload["part"], target)
+                return httpx.Response(204, headers={"Upload-Offset": str(upload["offset"])})
+
+        return httpx.Response(400, json={"error": f"unsupported {request.method} {path}"})
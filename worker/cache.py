@@ -0,0 +1,160 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Optional, Dict, Any, Callable, Tuple
+
+CACHE_TABLE = "conversion_cache"
+CACHE_PREFIX = "cache"
+
+def cache_key(local_path: str, params: Dict[str, Any]) -> str:
+    """sha256 of the input bytes plus everything that shapes the outputs"""
+    h = hashlib.sha256()
+    with open(local_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+def _is_not_found(error: Exception) -> bool:
+    """Whether a Storage error means the object doesn't exist"""
+    detail = error.args[0] if error.args else error
+    if isinstance(detail, dict):
+        # storage3 replaces the body's statusCode with the HTTP status, which
+        # Supabase often sends as 400 for a missing object
+        return str(detail.get("statusCode")) == "404" or detail.get("error") == "not_found" \
+            or "not found" in str(detail.get("message", "")).lower()
+    return "not found" in str(error).lower()
+
+class ConversionCache:
+    """Content-addressed cache of conversion outputs shared by every worker
+
+    Entries live in the conversion_cache table and map each named artifact
+    (the full STL, its levels of detail, ...) to a private copy under cache/ in
+    the converted bucket, so evicting an entry never breaks a showcase.
+    Eviction is least-recently-used, bounded by `max_entries`.
+    """
+
+    def __init__(self, client, bucket: str, max_entries: int):
+        self.client = client
+        self.bucket = bucket
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+    def _copy(self, from_path: str, to_path: str):
+        """Copy within the bucket, replacing `to_path` (Storage copy never overwrites)"""
+        bucket = self.client.storage.from_(self.bucket)
+        bucket.remove([to_path])
+        bucket.copy(from_path, to_path)
+
+    def fetch(self, key: str, destination: Callable[[str, str], str]) -> Optional[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """Copy every cached artifact to `destination(name, ext)`
+
+        Returns ({name: copied path}, metadata stored with the entry), or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            response = self.client.table(CACHE_TABLE).select("*").eq("key", key).limit(1).execute()
+            if not response.data:
+                self._count("misses")
+                return None
+
+            entry = response.data[0]
+            artifacts = entry.get("artifacts") or {"full": entry["object_path"]}
+            copied = {}
+            try:
+                for name, cached_path in artifacts.items():
+                    copied[name] = destination(name, os.path.splitext(cached_path)[1])
+                    self._copy(cached_path, copied[name])
+            except Exception as e:
+                if not _is_not_found(e):
+                    raise
+                # An object is gone (e.g. evicted by another worker): drop the
+                # entry together with whatever is left of it
+                print(f"[cache] stale entry {key[:12]}: {e}")
+                self.client.table(CACHE_TABLE).delete().eq("key", key).execute()
+                self.client.storage.from_(self.bucket).remove(list(artifacts.values()))
+                self._count("misses")
+                return None
+
+            self.client.table(CACHE_TABLE).update({
+                "hit_count": entry.get("hit_count", 0) + 1,
+                "last_used_at": "now()"
+            }).eq("key", key).execute()
+
+            self._count("hits")
+            print(f"[cache] hit {key[:12]} -> {copied['full']}")
+            return copied, entry.get("metadata") or {}
+
+        except Exception as e:
+            # The cache is an optimization; never fail a job because of it
+            print(f"[cache] lookup failed: {e}")
+            self._count("errors")
+            return None
+
+    def store(self, key: str, outputs: Dict[str, str], size_bytes: Optional[int] = None,
+              metadata: Optional[Dict[str, Any]] = None):
+        """Remember freshly uploaded outputs ({name: path}, including "full") under `key`"""
+        if not self.enabled:
+            return
+
+        try:
+            artifacts = {}
+            for name, output_path in outputs.items():
+                artifacts[name] = f"{CACHE_PREFIX}/{key}/{name}{os.path.splitext(output_path)[1]}"
+                self._copy(output_path, artifacts[name])
+
+            self.client.table(CACHE_TABLE).upsert({
+                "key": key,
+                "object_path": artifacts["full"],
+                "artifacts": artifacts,
+                "size_bytes": size_bytes,
+                "metadata": metadata or {},
+                "last_used_at": "now()"
+            }).execute()
+            self._count("stores")
+            self.evict()
+
+        except Exception as e:
+            print(f"[cache] store failed: {e}")
+            self._count("errors")
+
+    def evict(self):
+        """Drop the least recently used entries beyond `max_entries`"""
+        response = self.client.table(CACHE_TABLE).select("key, object_path, artifacts") \
+            .order("last_used_at", desc=True) \
+            .range(self.max_entries, self.max_entries + 999).execute()
+
+        stale = response.data or []
+        if not stale:
+            return
+
+        keys = [entry["key"] for entry in stale]
+        self.client.table(CACHE_TABLE).delete().in_("key", keys).execute()
+        paths = []
+        for entry in stale:
+            paths.extend((entry.get("artifacts") or {"full": entry["object_path"]}).values())
+        self.client.storage.from_(self.bucket).remove(paths)
+        self._count("evictions", len(stale))
+        print(f"[cache] evicted {len(stale)} entries")
+
+    def summary(self) -> Dict[str, Any]:
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        return stats
@@ -1,13 +1,162 @@
 import sys
 import os
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
-def convert_to_stl(input_path: str, output_path: str):
-    """Convert STEP/OBJ to STL using FreeCAD"""
-    try:
+import numpy as np
+
+from obj_io import obj_to_binary_stl
+from stl_io import normalize_stl, tessellation_to_arrays, write_binary_stl
+
+# Linear deflection for STEP inputs, as a fraction of the bounding box diagonal
+TESSELLATION_REL_TOLERANCE = float(os.getenv("TESSELLATION_REL_TOLERANCE", "0.0005"))
+# Triangle budget the tessellation is coarsened to fit, and the count below
+# which it is refined (as long as refining still adds detail)
+TESSELLATION_MAX_TRIANGLES = int(os.getenv("TESSELLATION_MAX_TRIANGLES", "2000000"))
+TESSELLATION_MIN_TRIANGLES = int(os.getenv("TESSELLATION_MIN_TRIANGLES", "10000"))
+TESSELLATION_MAX_PASSES = 5
+# "separate" tessellates the bodies of a multi-body STEP file side by side in a
+# process pool; "fuse" boolean-unions them first as before
+ASSEMBLY_MODE = os.getenv("ASSEMBLY_MODE", "separate")
+# Every engine has its own pool, so by default the cores are split between the
+# worker's WORKER_CONCURRENCY engines (1 means tessellate in the engine itself).
+# With WORKER_CONCURRENCY at its default of one per core this is 1, i.e. bodies
+# are only tessellated in parallel when an operator lowers the concurrency or
+# sets this explicitly
+TESSELLATION_WORKERS = int(
+    os.getenv("TESSELLATION_WORKERS")
+    or max(1, (os.cpu_count() or 1) // int(os.getenv("WORKER_CONCURRENCY") or os.cpu_count() or 1))
+)
+# "numpy" writes tessellations directly as binary STL, "mesh" goes through
+# FreeCAD's Mesh module as before
+STL_WRITER = os.getenv("STL_WRITER", "numpy")
+# "native" streams OBJ files straight to binary STL, "freecad" imports them
+# through FreeCAD's Mesh module as before
+OBJ_READER = os.getenv("OBJ_READER", "native")
+# Bump whenever a change alters the STL produced for the same input
+CONVERTER_VERSION = 7
+
+_freecad = None
+_tessellation_pool: Optional[ProcessPoolExecutor] = None
+
+def conversion_params() -> Dict[str, Any]:
+    """Everything besides the input bytes that determines the output"""
+    return {
+        "version": CONVERTER_VERSION,
+        "rel_tolerance": TESSELLATION_REL_TOLERANCE,
+        "max_triangles": TESSELLATION_MAX_TRIANGLES,
+        "min_triangles": TESSELLATION_MIN_TRIANGLES,
+        "assembly_mode": ASSEMBLY_MODE,
+        "writer": STL_WRITER,
+        "obj_reader": OBJ_READER,
+    }
+
+def load_freecad() -> SimpleNamespace:
+    """Import the FreeCAD modules once per process and reuse them afterwards"""
+    global _freecad
+    if _freecad is None:
         import FreeCAD
         import Mesh
         import Import
+        import Part
+        _freecad = SimpleNamespace(FreeCAD=FreeCAD, Mesh=Mesh, Import=Import, Part=Part)
+    return _freecad
+
+def tessellate_adaptive(
+    tessellate: Callable[[float, bool], Tuple[np.ndarray, np.ndarray]],
+    diagonal: float,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Pick a tolerance from the model size, then adjust it to the triangle budget
+
+    `tessellate(tolerance, refine)` must return (points, triangles) arrays;
+    `refine` asks it to discard any triangulation cached on the shape.
+    """
+    floor = max(diagonal, 1e-9) * 1e-6
+    tolerance = max(diagonal * TESSELLATION_REL_TOLERANCE, floor)
+    fitting = None
+    last_count = None
+
+    for attempt in range(TESSELLATION_MAX_PASSES):
+        points, triangles = tessellate(tolerance, attempt > 0)
+        count = len(triangles)
+        print(f"[convert] tolerance {tolerance:.6g} -> {count} triangles")
+
+        if count > TESSELLATION_MAX_TRIANGLES:
+            if fitting is not None:
+                # Refining overshot the budget: keep the last mesh that fit
+                return fitting
+            # Triangle count grows roughly with 1 / tolerance
+            tolerance *= 1.25 * count / TESSELLATION_MAX_TRIANGLES
+        elif count < TESSELLATION_MIN_TRIANGLES and count != last_count and tolerance > floor:
+            fitting = (points, triangles, tolerance)
+            tolerance = max(tolerance * max(count / TESSELLATION_MIN_TRIANGLES, 0.25), floor)
+        else:
+            return points, triangles, tolerance
+
+        last_count = count
 
+    if fitting is not None:
+        return fitting
+    print(f"[convert] triangle budget not met after {TESSELLATION_MAX_PASSES} passes, keeping {count}")
+    return points, triangles, tolerance
+
+def _tessellate_brep(brep: str, tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Pool task: rebuild one body from its BREP text and tessellate it"""
+    shape = load_freecad().Part.Shape()
+    shape.importBrepFromString(brep)
+    return tessellation_to_arrays(shape.tessellate(tolerance))
+
+def tessellate_bodies(shapes: List[Any], tolerance: float, refine: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Tessellate each body on its own and concatenate the meshes
+
+    Bodies are shipped to the pool as BREP strings (so `refine` is implied
+    there); with a single worker or a single body everything stays in-process.
+    """
+    global _tessellation_pool
+    if TESSELLATION_WORKERS <= 1 or len(shapes) <= 1:
+        meshes = [tessellation_to_arrays(s.tessellate(tolerance, refine)) for s in shapes]
+    else:
+        if _tessellation_pool is None:
+            _tessellation_pool = ProcessPoolExecutor(
+                max_workers=TESSELLATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        breps = [s.exportBrepToString() for s in shapes]
+        meshes = list(_tessellation_pool.map(_tessellate_brep, breps, [tolerance] * len(breps)))
+
+    offsets = np.cumsum([0] + [len(points) for points, _ in meshes[:-1]])
+    points = np.concatenate([points for points, _ in meshes]) if meshes else np.zeros((0, 3))
+    triangles = np.concatenate([tris + offset for (_, tris), offset in zip(meshes, offsets)]) \
+        if meshes else np.zeros((0, 3), dtype=np.int64)
+    return points, triangles
+
+def split_bodies(shape) -> List[Any]:
+    """The solids of a compound, if they account for every face in it"""
+    solids = shape.Solids
+    if len(solids) > 1 and sum(len(s.Faces) for s in solids) == len(shape.Faces):
+        return list(solids)
+    return [shape]
+
+def _has_shape(obj) -> bool:
+    return hasattr(obj, 'Shape') and not obj.Shape.isNull()
+
+def leaf_shape_objects(doc) -> List[Any]:
+    """Document objects with a shape that no child shape is part of
+
+    Import.insert() adds parent Part/compound objects whose shapes already
+    contain their children's, so meshing every object would mesh those
+    bodies twice.
+    """
+    return [obj for obj in doc.Objects
+            if _has_shape(obj) and not any(_has_shape(child) for child in obj.OutList)]
+
+def convert_to_stl(input_path: str, output_path: str):
+    """Convert STEP/OBJ to STL using FreeCAD"""
+    doc = None
+    try:
         print(f"[convert] converting {input_path} to {output_path}")
 
         # Determine file type
@@ -15,39 +164,54 @@ def convert_to_stl(input_path: str, output_path: str):
 
         if ext in ['step', 'stp']:
             # Import STEP file using Part module
-            import Part
-            doc = FreeCAD.newDocument("temp")
+            fc = load_freecad()
+            doc = fc.FreeCAD.newDocument(f"convert_{uuid.uuid4().hex}")
 
             # Try using Part.read() first (more direct method)
             try:
-                shape = Part.read(input_path)
+                shape = fc.Part.read(input_path)
                 print(f"[convert] imported shape with Part.read()")
+                shapes = split_bodies(shape) if ASSEMBLY_MODE == "separate" else [shape]
             except Exception as e:
                 print(f"[convert] Part.read() failed: {e}, trying Import.insert()")
                 # Fallback to Import.insert()
-                Import.insert(input_path, "temp")
-                objs = [obj for obj in doc.Objects if hasattr(obj, 'Shape')]
+                fc.Import.insert(input_path, doc.Name)
+                objs = leaf_shape_objects(doc)
                 if not objs:
                     raise Exception(f"No shapes found in STEP file. Document has {len(doc.Objects)} objects")
                 shapes = [obj.Shape for obj in objs]
-                shape = shapes[0] if len(shapes) == 1 else shapes[0].multiFuse(shapes[1:])
+                if ASSEMBLY_MODE != "separate" and len(shapes) > 1:
+                    shapes = [shapes[0].multiFuse(shapes[1:])]
 
             # Convert shape to mesh and export
-            print(f"[convert] converting shape to mesh...")
-            mesh = Mesh.Mesh()
-            mesh.addFacets(shape.tessellate(0.01))
-            mesh.write(output_path)
+            print(f"[convert] converting {len(shapes)} bodies to mesh...")
+            diagonal = shapes[0].BoundBox.DiagonalLength if len(shapes) == 1 \
+                else fc.Part.makeCompound(shapes).BoundBox.DiagonalLength
+            points, triangles, tolerance = tessellate_adaptive(
+                lambda tol, refine: tessellate_bodies(shapes, tol, refine),
+                diagonal,
+            )
+            if STL_WRITER == "mesh":
+                mesh = fc.Mesh.Mesh(points[triangles].reshape(-1, 3).tolist())
+                mesh.write(output_path)
+            else:
+                facets = write_binary_stl(output_path, points, triangles)
+                print(f"[convert] wrote {facets} facets")
+
+        elif ext == 'obj' and OBJ_READER == "native":
+            facets = obj_to_binary_stl(input_path, output_path)
+            print(f"[convert] wrote {facets} facets")
 
         elif ext == 'obj':
             # Import OBJ and convert to STL
-            doc = FreeCAD.newDocument("temp")
-            Mesh.insert(input_path, "temp")
-            Mesh.export(doc.Objects, output_path)
+            fc = load_freecad()
+            doc = fc.FreeCAD.newDocument(f"convert_{uuid.uuid4().hex}")
+            fc.Mesh.insert(input_path, doc.Name)
+            fc.Mesh.export(doc.Objects, output_path)
 
         elif ext == 'stl':
-            # Already STL, just copy
-            import shutil
-            shutil.copy(input_path, output_path)
+            # Already STL: validate it, rewriting ASCII as binary
+            normalize_stl(input_path, output_path)
 
         else:
             raise Exception(f"Unsupported file type: {ext}")
@@ -61,6 +225,12 @@ def convert_to_stl(input_path: str, output_path: str):
     except Exception as e:
         raise Exception(f"FreeCAD conversion failed: {e}")
 
+    finally:
+        # Documents are never reused; closing them is what keeps a
+        # long-running worker's memory flat
+        if doc is not None:
+            load_freecad().FreeCAD.closeDocument(doc.Name)
+
 if __name__ == "__main__":
     if len(sys.argv) != 3:
         print("Usage: python convert_to_stl.py <input_path> <output_path>")
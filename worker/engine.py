@@ -0,0 +1,253 @@
+import os
+import gc
+import time
+import queue
+import signal
+import resource
+import multiprocessing
+from typing import Any, Callable, List, Optional, Tuple
+
+from convert_to_stl import convert_to_stl, load_freecad
+from stl_io import normalize_stl
+
+# Recycle an engine after this many conversions or once its RSS crosses the
+# threshold (0 disables either limit)
+ENGINE_MAX_JOBS = int(os.getenv("ENGINE_MAX_JOBS", "200"))
+ENGINE_MAX_RSS_MB = int(os.getenv("ENGINE_MAX_RSS_MB", "2048"))
+# Every job starts with exactly one of these; the stats, LOD, web mesh and
+# thumbnail calls that follow don't count as further jobs
+_JOB_ENTRY_POINTS = (convert_to_stl, normalize_stl)
+
+# Per-call sandbox limits, enforced by the parent while it waits for a reply;
+# a breach kills the engine (and its tessellation workers) and fails the job
+CONVERSION_TIMEOUT_SECONDS = float(os.getenv("CONVERSION_TIMEOUT_SECONDS", "900"))
+CONVERSION_MAX_CPU_SECONDS = float(os.getenv("CONVERSION_MAX_CPU_SECONDS", "0"))
+CONVERSION_MAX_RSS_MB = int(os.getenv("CONVERSION_MAX_RSS_MB", "4096"))
+MONITOR_INTERVAL = 0.5
+# The poll above can miss a single huge allocation, so each engine process
+# also gets a hard address-space cap of CONVERSION_MAX_RSS_MB plus this much
+# headroom for mapped libraries, thread stacks and malloc arenas
+CONVERSION_ADDRESS_SPACE_HEADROOM_MB = int(os.getenv("CONVERSION_ADDRESS_SPACE_HEADROOM_MB", "2048"))
+
+_ctx = multiprocessing.get_context("spawn")
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+class ConversionLimitExceeded(Exception):
+    """A call ran past its time, CPU or memory limit and its engine was killed"""
+
+def current_rss_bytes() -> int:
+    """Resident set size of the calling process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but good enough off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def process_tree(pid: int) -> List[int]:
+    """pid and all its descendants (Linux only; just pid elsewhere)"""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return pids
+
+def tree_usage(pid: int) -> Tuple[int, float]:
+    """(RSS bytes, CPU seconds) summed over a process tree; zeros without /proc"""
+    rss, cpu = 0, 0.0
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/statm") as f:
+                rss += int(f.read().split()[1]) * page_size
+            with open(f"/proc/{member}/stat") as f:
+                # Fields after the parenthesised command name; utime and stime are 14 and 15
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        except (OSError, ValueError, IndexError):
+            continue
+    return rss, cpu
+
+def limit_address_space():
+    """Cap the calling process's virtual memory (inherited by its children), so
+    an allocation past the limit raises MemoryError instead of waking the OOM
+    killer, which may pick the worker itself"""
+    if not CONVERSION_MAX_RSS_MB or not hasattr(resource, "RLIMIT_AS"):
+        return
+    limit = (CONVERSION_MAX_RSS_MB + CONVERSION_ADDRESS_SPACE_HEADROOM_MB) * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (OSError, ValueError) as e:
+        print(f"[engine] could not limit address space: {e}")
+
+def _serve(conn):
+    """Engine process: load FreeCAD once, then run tasks until told to stop"""
+    # Own process group, so a kill takes the tessellation workers down with it
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    limit_address_space()
+
+    try:
+        load_freecad()
+    except ImportError as e:
+        # Not fatal: STL jobs never need FreeCAD, others will report the error
+        print(f"[engine] FreeCAD unavailable: {e}")
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        func, args = request
+        try:
+            reply = ("ok", func(*args))
+        except MemoryError:
+            reply = ("error", f"ran out of memory (limit {CONVERSION_MAX_RSS_MB} MB)")
+        except Exception as e:
+            reply = ("error", str(e))
+
+        gc.collect()
+        conn.send(reply + (current_rss_bytes(),))
+
+    conn.close()
+
+class ConversionEngine:
+    """A long-lived, warm FreeCAD process that is recycled as it ages"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+        self.jobs = 0
+        self.rss = 0
+
+    def start(self):
+        parent_conn, child_conn = _ctx.Pipe()
+        # Not a daemon: the engine may run a process pool of its own
+        self.process = _ctx.Process(target=_serve, args=(child_conn,), name=self.name)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs = 0
+        self.rss = 0
+        print(f"[engine] {self.name} started (pid {self.process.pid})")
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def kill(self):
+        """Hard-stop the engine and everything it spawned"""
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def _limit_breach(self, started: float, cpu_start: float) -> Optional[str]:
+        """Describe the first limit the running call has exceeded, if any"""
+        elapsed = time.monotonic() - started
+        if CONVERSION_TIMEOUT_SECONDS and elapsed > CONVERSION_TIMEOUT_SECONDS:
+            return f"timed out after {elapsed:.0f}s (limit {CONVERSION_TIMEOUT_SECONDS:g}s)"
+        if not (CONVERSION_MAX_CPU_SECONDS or CONVERSION_MAX_RSS_MB):
+            return None
+        rss, cpu = tree_usage(self.process.pid)
+        if CONVERSION_MAX_RSS_MB and rss > CONVERSION_MAX_RSS_MB * 1024 * 1024:
+            return f"used {rss // (1024 * 1024)} MB of memory (limit {CONVERSION_MAX_RSS_MB} MB)"
+        if CONVERSION_MAX_CPU_SECONDS and cpu - cpu_start > CONVERSION_MAX_CPU_SECONDS:
+            return f"used {cpu - cpu_start:.0f}s of CPU time (limit {CONVERSION_MAX_CPU_SECONDS:g}s)"
+        return None
+
+    def needs_recycle(self) -> bool:
+        if ENGINE_MAX_JOBS and self.jobs >= ENGINE_MAX_JOBS:
+            return True
+        if ENGINE_MAX_RSS_MB and self.rss >= ENGINE_MAX_RSS_MB * 1024 * 1024:
+            return True
+        return False
+
+    def call(self, func: Callable, *args) -> Any:
+        """Run a module-level function in the engine process, restarting it when needed"""
+        if self.process is None or not self.process.is_alive():
+            self.start()
+
+        try:
+            self.conn.send((func, args))
+            started = time.monotonic()
+            _, cpu_start = tree_usage(self.process.pid) if CONVERSION_MAX_CPU_SECONDS else (0, 0.0)
+            while not self.conn.poll(MONITOR_INTERVAL):
+                breach = self._limit_breach(started, cpu_start)
+                if breach:
+                    print(f"[engine] killing {self.name}: {getattr(func, '__name__', func)} {breach}")
+                    self.kill()
+                    raise ConversionLimitExceeded(f"Conversion {breach}")
+            status, result, self.rss = self.conn.recv()
+        except (EOFError, OSError):
+            code = self.process.exitcode if self.process else None
+            self.stop()
+            raise Exception(f"Conversion engine {self.name} died (exit code {code})")
+
+        if func in _JOB_ENTRY_POINTS:
+            self.jobs += 1
+        if self.needs_recycle():
+            print(f"[engine] recycling {self.name} after {self.jobs} jobs ({self.rss // (1024 * 1024)} MB RSS)")
+            self.stop()
+
+        if status != "ok":
+            raise Exception(result)
+        return result
+
+class EnginePool:
+    """A fixed set of conversion engines shared by the job threads"""
+
+    def __init__(self, size: int):
+        self.engines = [ConversionEngine(f"engine-{i}") for i in range(size)]
+        self.idle: "queue.Queue[ConversionEngine]" = queue.Queue()
+        for engine in self.engines:
+            self.idle.put(engine)
+
+    def start(self):
+        """Warm every engine up front so the first jobs don't pay for it"""
+        for engine in self.engines:
+            engine.start()
+
+    def call(self, func: Callable, *args) -> Any:
+        engine = self.idle.get()
+        try:
+            return engine.call(func, *args)
+        finally:
+            self.idle.put(engine)
+
+    def convert(self, input_path: str, output_path: str):
+        self.call(convert_to_stl, input_path, output_path)
+
+    def close(self):
+        for engine in self.engines:
+            engine.stop()
@@ -0,0 +1,116 @@
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from stl_io import binary_facet_count, read_binary_stl, write_binary_stl
+
+# Coarser levels written next to the full-resolution STL, as name:triangles
+LOD_LEVELS = os.getenv("LOD_LEVELS", "preview:20000,medium:200000")
+CLUSTER_PASSES = 8
+
+def lod_levels() -> List[Tuple[str, int]]:
+    """Parse LOD_LEVELS into (name, target triangles), coarsest first"""
+    levels = []
+    for item in LOD_LEVELS.split(","):
+        if ":" in item:
+            name, target = item.split(":", 1)
+            levels.append((name.strip(), int(target)))
+    return sorted(levels, key=lambda level: level[1])
+
+def weld(vertices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge bit-identical corners of (n, 3, 3) triangles into an indexed mesh"""
+    flat = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    order = np.lexsort((flat[:, 2], flat[:, 1], flat[:, 0]))
+    ordered = flat[order]
+    new = np.empty(len(flat), dtype=bool)
+    new[:1] = True
+    new[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    index = np.empty(len(flat), dtype=np.int64)
+    index[order] = np.cumsum(new) - 1
+    return ordered[new], index.reshape(-1, 3)
+
+def _unique_triangles(triangles: np.ndarray, count: int) -> np.ndarray:
+    """Drop collapsed triangles and repeats of the same three points"""
+    keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])
+    triangles = triangles[keep]
+    ordered = np.sort(triangles, axis=1)
+    bits = max(int(count - 1).bit_length(), 1)
+    if bits * 3 <= 63:
+        keys = (ordered[:, 0] << (2 * bits)) | (ordered[:, 1] << bits) | ordered[:, 2]
+        _, first = np.unique(keys, return_index=True)
+    else:
+        _, first = np.unique(ordered, axis=0, return_index=True)
+    return triangles[np.sort(first)]
+
+def cluster_vertices(points: np.ndarray, triangles: np.ndarray, cells: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Vertex-clustering decimation on a grid with `cells` cells along the longest axis
+
+    Every point snaps to the mean of its grid cell; triangles that collapse or
+    duplicate another are dropped. Returns (points, triangles).
+    """
+    pts = points.astype(np.float64)
+    lo = pts.min(axis=0)
+    extent = pts.max(axis=0) - lo
+    cell = max(extent.max(), 1e-12) / cells
+    dims = np.maximum(np.ceil(extent / cell).astype(np.int64), 1) + 1
+
+    ijk = np.minimum(((pts - lo) / cell).astype(np.int64), dims - 1)
+    keys = (ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.reshape(-1)
+
+    counts = np.bincount(cluster)
+    merged = np.stack([np.bincount(cluster, weights=pts[:, axis]) for axis in range(3)], axis=1)
+    merged /= counts[:, None]
+
+    return merged, _unique_triangles(cluster[triangles], len(merged))
+
+def decimate(points: np.ndarray, triangles: np.ndarray, target: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Decimate an indexed mesh to at most `target` triangles, as close to it as possible"""
+    # A closed surface on a k-cell grid keeps on the order of k^2 triangles
+    low, high = 1, max(2, int(np.sqrt(target) * 4))
+    best = cluster_vertices(points, triangles, low)
+
+    for _ in range(CLUSTER_PASSES):
+        if high - low <= 1:
+            break
+        mid = (low + high) // 2
+        candidate = cluster_vertices(points, triangles, mid)
+        if len(candidate[1]) <= target:
+            low, best = mid, candidate
+        else:
+            high = mid
+
+    return best
+
+def build_lods(vertices: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Decimated meshes for each configured level coarser than the input"""
+    lods = {}
+    levels = [(name, target) for name, target in lod_levels() if target < len(vertices)]
+    if not levels:
+        return lods
+
+    points, triangles = weld(vertices)
+    for name, target in levels:
+        lod_points, lod_triangles = decimate(points, triangles, target)
+        print(f"[lod] {name}: {len(vertices)} -> {len(lod_triangles)} triangles")
+        lods[name] = (lod_points, lod_triangles)
+    return lods
+
+def write_lods(stl_path: str) -> Dict[str, str]:
+    """Write each level next to a binary STL as <stem>.<level>.stl
+
+    Returns {level: local path}; inputs that aren't binary STL get no levels.
+    """
+    if binary_facet_count(stl_path) < 0:
+        print(f"[lod] {stl_path} is not a binary STL, skipping levels of detail")
+        return {}
+
+    facets = read_binary_stl(stl_path)
+    stem = os.path.splitext(stl_path)[0]
+    paths = {}
+    for name, (points, triangles) in build_lods(facets["vertices"]).items():
+        paths[name] = f"{stem}.{name}.stl"
+        write_binary_stl(paths[name], points, triangles)
+    return paths
@@ -0,0 +1,42 @@
+import os
+from typing import Any, Dict
+
+import numpy as np
+
+from lod import weld
+from stl_io import binary_facet_count, read_binary_stl
+
+def compute_mesh_stats(vertices: np.ndarray) -> Dict[str, Any]:
+    """Bounding box, counts, surface area and enclosed volume of (n, 3, 3) triangles
+
+    The volume is the divergence-theorem sum of signed tetrahedra, so it is
+    only meaningful for closed meshes; its sign is dropped to tolerate
+    inverted winding.
+    """
+    if len(vertices) == 0:
+        return {"bbox": None, "triangle_count": 0, "vertex_count": 0, "surface_area": 0.0, "volume": 0.0}
+
+    v = vertices.astype(np.float64)
+    corners = v.reshape(-1, 3)
+    cross = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    points, _ = weld(vertices)
+
+    return {
+        "bbox": {"min": corners.min(axis=0).tolist(), "max": corners.max(axis=0).tolist()},
+        "triangle_count": len(vertices),
+        "vertex_count": len(points),
+        "surface_area": float(np.linalg.norm(cross, axis=1).sum() / 2),
+        "volume": float(abs(np.einsum("ij,ij->", v[:, 0], np.cross(v[:, 1], v[:, 2])) / 6)),
+    }
+
+def mesh_stats(stl_path: str) -> Dict[str, Any]:
+    """Statistics of a binary STL plus its file size; {} if it isn't one"""
+    if binary_facet_count(stl_path) < 0:
+        print(f"[stats] {stl_path} is not a binary STL, skipping mesh statistics")
+        return {}
+
+    stats = compute_mesh_stats(np.asarray(read_binary_stl(stl_path)["vertices"]))
+    stats["file_size"] = os.path.getsize(stl_path)
+    print(f"[stats] {stats['triangle_count']} triangles, {stats['vertex_count']} vertices, "
+          f"area {stats['surface_area']:.6g}, volume {stats['volume']:.6g}")
+    return stats
@@ -0,0 +1,136 @@
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; covers cache hits (ms) up to very large STEP conversions (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _labels(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # label key -> (per-bucket counts, sum, count)
+        self.series: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        with self.lock:
+            counts, total, n = self.series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.series[key] = [counts, total + value, n + 1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, n) in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {n}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {n}")
+        return lines
+
+QUEUE_WAIT = Histogram("worker_queue_wait_seconds", "Time from job creation to claim")
+STAGE_LATENCY = Histogram("worker_stage_seconds", "Time spent in each job stage")
+JOB_LATENCY = Histogram("worker_job_seconds", "Time from claim to finish")
+JOBS = Counter("worker_jobs_total", "Finished jobs by status")
+ERRORS = Counter("worker_errors_total", "Failed jobs by the stage that failed")
+BYTES = Counter("worker_bytes_total", "Bytes transferred by direction")
+TRIANGLES = Counter("worker_triangles_total", "Triangles in converted outputs")
+
+REGISTRY = [QUEUE_WAIT, STAGE_LATENCY, JOB_LATENCY, JOBS, ERRORS, BYTES, TRIANGLES]
+
+class JobTimer:
+    """Collects per-stage wall times for one job and feeds the stage histogram"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        # The stage an exception escaped from; None outside any stage
+        self.current: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        previous, self.current = self.current, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 4)
+            STAGE_LATENCY.observe(elapsed, stage=name)
+        # Only reached when the stage succeeded, so a later failure between
+        # stages isn't blamed on it
+        self.current = previous
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+def render(extra: Optional[Callable[[], List[str]]] = None) -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    if extra:
+        lines.extend(extra())
+    return "\n".join(lines) + "\n"
+
+def start_metrics_server(host: str, port: int, extra: Optional[Callable[[], List[str]]] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics (Prometheus text format) from a daemon thread; port 0 disables"""
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render(extra).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[metrics] serving http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,68 @@
+import select
+import threading
+import time
+from typing import Optional
+
+CHANNEL = "jobs_queued"
+
+def _listen(dsn: str, wakeup: threading.Event, connected: threading.Event):
+    """LISTEN on the jobs_queued channel and set `wakeup` on every notification"""
+    import psycopg2
+    import psycopg2.extensions
+
+    backoff = 1.0
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL};")
+
+            print(f"[notify] listening on {CHANNEL}")
+            connected.set()
+            backoff = 1.0
+
+            # Catch anything queued while we were (re)connecting
+            wakeup.set()
+
+            while True:
+                # The timeout only bounds how long a dead socket goes unnoticed
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1;")
+                    continue
+
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    wakeup.set()
+
+        except Exception as e:
+            connected.clear()
+            print(f"[notify] listener error: {e}, reconnecting in {backoff:.0f}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+def start_listener(dsn: Optional[str], wakeup: threading.Event, connected: threading.Event) -> Optional[threading.Thread]:
+    """Start the notification listener thread, or return None if it can't run"""
+    if not dsn:
+        print("[notify] SUPABASE_DB_URL not set, falling back to polling only")
+        return None
+
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        print("[notify] psycopg2 not installed, falling back to polling only")
+        return None
+
+    thread = threading.Thread(target=_listen, args=(dsn, wakeup, connected), name="notify", daemon=True)
+    thread.start()
+    return thread
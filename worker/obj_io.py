@@ -0,0 +1,127 @@
+import re
+from typing import List
+
+import numpy as np
+
+from stl_io import ASCII_READ_SIZE, BinarySTLWriter
+
+_SLASH_SUFFIX_RE = re.compile(rb"/\S*")
+
+class _Points:
+    """Growable (n, 3) float32 array (amortized O(1) appends)"""
+
+    def __init__(self):
+        self.data = np.empty((1024, 3), dtype=np.float32)
+        self.size = 0
+
+    def extend(self, points: np.ndarray):
+        needed = self.size + len(points)
+        if needed > len(self.data):
+            grown = np.empty((max(needed, 2 * len(self.data)), 3), dtype=np.float32)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = points
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+def _parse_vertices(lines: List[bytes]) -> np.ndarray:
+    """x y z of `v` lines (extra w or colour values are ignored)"""
+    try:
+        values = np.fromstring(b" ".join(line[2:] for line in lines), dtype=np.float32, sep=" ")
+        if len(values) == 3 * len(lines):
+            return values.reshape(-1, 3)
+    except ValueError:
+        pass
+    # Slow path for lines carrying more than three numbers
+    try:
+        return np.array([line.split()[1:4] for line in lines], dtype=np.float32).reshape(-1, 3)
+    except ValueError:
+        raise ValueError("malformed vertex line")
+
+def _fan_triangles(indices: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Triangulate polygons (flattened corner indices + corner counts) as fans"""
+    # Faces with fewer than three corners are skipped along with their corners
+    keep = counts >= 3
+    if not keep.all():
+        indices = indices[np.repeat(keep, counts)]
+        counts = counts[keep]
+    starts = np.cumsum(counts) - counts
+    fans = counts - 2
+    face = np.repeat(np.arange(len(counts)), fans)
+    # j = 1 .. k-2 within each polygon
+    j = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+    first = starts[face]
+    return np.stack([indices[first], indices[first + j], indices[first + j + 1]], axis=1)
+
+def obj_to_binary_stl(src: str, dst: str) -> int:
+    """Stream a Wavefront OBJ into a binary STL; returns the facet count
+
+    Only `v` and `f` records matter: faces are fan-triangulated, texture and
+    normal references (v/vt/vn) are dropped and negative indices count back
+    from the vertices read so far. Triangles are written in batches as soon
+    as their vertices are known, so memory holds the vertex table plus one
+    read buffer.
+    """
+    points = _Points()
+    deferred: List[np.ndarray] = []
+
+    with open(src, 'rb') as f, BinarySTLWriter(dst) as writer:
+        pending = b""
+        while True:
+            chunk = f.read(ASCII_READ_SIZE)
+            text = pending + chunk
+            if chunk:
+                cut = text.rfind(b"\n") + 1
+                text, pending = text[:cut], text[cut:]
+
+            vertex_lines: List[bytes] = []
+            face_tokens: List[bytes] = []
+            counts: List[int] = []
+            # Vertices defined before each face line, for negative indices
+            defined: List[int] = []
+            for line in text.splitlines():
+                line = line.strip()
+                if line[:2] == b"v " or line[:2] == b"v\t":
+                    vertex_lines.append(line)
+                elif line[:2] == b"f " or line[:2] == b"f\t":
+                    corners = line.split()[1:]
+                    face_tokens.extend(corners)
+                    counts.append(len(corners))
+                    defined.append(points.size + len(vertex_lines))
+
+            if vertex_lines:
+                points.extend(_parse_vertices(vertex_lines))
+
+            if counts:
+                try:
+                    raw = np.fromstring(_SLASH_SUFFIX_RE.sub(b"", b" ".join(face_tokens)), dtype=np.int64, sep=" ")
+                except ValueError:
+                    raise ValueError(f"{src} has a malformed face")
+                if len(raw) != len(face_tokens) or (raw == 0).any():
+                    raise ValueError(f"{src} has a malformed face")
+                counts_array = np.array(counts, dtype=np.int64)
+                base = np.repeat(np.array(defined, dtype=np.int64), counts_array)
+                indices = np.where(raw > 0, raw - 1, base + raw)
+                if (indices < 0).any():
+                    raise ValueError(f"{src} has a face index before the first vertex")
+
+                triangles = _fan_triangles(indices, counts_array)
+                if len(triangles) and triangles.max() < points.size:
+                    writer.write(points.view()[triangles])
+                elif len(triangles):
+                    # Refers to vertices further down the file
+                    deferred.append(triangles)
+
+            if not chunk:
+                break
+
+        for triangles in deferred:
+            if triangles.max() >= points.size:
+                raise ValueError(f"{src} has a face index past the last vertex")
+            writer.write(points.view()[triangles])
+
+    if writer.count == 0:
+        raise ValueError(f"{src} contains no faces")
+    return writer.count
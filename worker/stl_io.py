@@ -0,0 +1,199 @@
+import os
+import re
+import struct
+import shutil
+
+import numpy as np
+
+# One binary STL facet: normal, three vertices, attribute byte count (50 bytes)
+FACET_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attr", "<u2"),
+])
+HEADER_SIZE = 80
+# Facets converted and written per batch, which bounds the writer's memory
+WRITE_BATCH = 1_000_000
+# ASCII STL text parsed per read; memory stays a small multiple of this
+ASCII_READ_SIZE = 16 * 1024 * 1024
+
+_VERTEX_RE = re.compile(rb"vertex\s+(\S+\s+\S+\s+\S+)")
+
+def facet_normals(vertices: np.ndarray) -> np.ndarray:
+    """Unit normals of (n, 3, 3) triangles; degenerate facets get a zero normal"""
+    v = vertices.astype(np.float64, copy=False)
+    normals = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    normals[lengths[:, 0] == 0] = 0.0
+    return normals
+
+class BinarySTLWriter:
+    """Write binary STL facets in batches; the facet count is patched on close"""
+
+    def __init__(self, path: str, header: bytes = b"Showcase3D binary STL"):
+        self.f = open(path, 'wb')
+        self.f.write(header[:HEADER_SIZE].ljust(HEADER_SIZE, b"\0"))
+        self.f.write(struct.pack("<I", 0))
+        self.count = 0
+
+    def write(self, vertices: np.ndarray):
+        """Append (n, 3, 3) triangles"""
+        for start in range(0, len(vertices), WRITE_BATCH):
+            batch = vertices[start:start + WRITE_BATCH]
+            records = np.zeros(len(batch), dtype=FACET_DTYPE)
+            records["normal"] = facet_normals(batch)
+            records["vertices"] = batch
+            records.tofile(self.f)
+            self.count += len(batch)
+
+    def close(self):
+        self.f.seek(HEADER_SIZE)
+        self.f.write(struct.pack("<I", self.count))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_binary_stl(path: str, points: np.ndarray, triangles: np.ndarray) -> int:
+    """Write an indexed mesh (points (n, 3), triangles (m, 3)) as binary STL
+
+    Returns the number of facets written.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    with BinarySTLWriter(path) as writer:
+        for start in range(0, len(triangles), WRITE_BATCH):
+            writer.write(points[triangles[start:start + WRITE_BATCH]])
+    return len(triangles)
+
+def tessellation_to_arrays(tessellation) -> tuple:
+    """Turn FreeCAD's ([Vector], [(i, j, k)]) tessellation into NumPy arrays"""
+    points, triangles = tessellation
+    coords = np.fromiter(
+        (c for p in points for c in (p.x, p.y, p.z)),
+        dtype=np.float64,
+        count=3 * len(points),
+    ).reshape(-1, 3)
+    return coords, np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+def binary_facet_count(path: str) -> int:
+    """Facet count of a well-formed binary STL, or -1 if it isn't one"""
+    size = os.path.getsize(path)
+    if size < HEADER_SIZE + 4:
+        return -1
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        (count,) = struct.unpack("<I", f.read(4))
+    return count if size == HEADER_SIZE + 4 + count * FACET_DTYPE.itemsize else -1
+
+def read_binary_stl(path: str) -> np.ndarray:
+    """Memory-map the facets of a binary STL as a FACET_DTYPE array"""
+    count = binary_facet_count(path)
+    if count < 0:
+        raise ValueError(f"{path} is not a binary STL")
+    if count == 0:
+        return np.zeros(0, dtype=FACET_DTYPE)
+    return np.memmap(path, dtype=FACET_DTYPE, mode='r', offset=HEADER_SIZE + 4, shape=(count,))
+
+def is_ascii_stl(path: str) -> bool:
+    """True for text STL (which may share a "solid" header with binary files)"""
+    if binary_facet_count(path) >= 0:
+        return False
+    with open(path, 'rb') as f:
+        head = f.read(1024).lstrip()
+    return head[:5].lower() == b"solid" and (b"facet" in head or b"endsolid" in head)
+
+def ascii_stl_to_binary(src: str, dst: str) -> int:
+    """Stream an ASCII STL into a binary one in constant memory; returns the facet count"""
+    with open(src, 'rb') as f, BinarySTLWriter(dst) as writer:
+        pending = b""
+        while True:
+            chunk = f.read(ASCII_READ_SIZE)
+            text = pending + chunk
+            if chunk:
+                # Parse whole facets only; the rest waits for the next read
+                cut = text.rfind(b"endfacet")
+                if cut < 0:
+                    if len(text) > 4 * ASCII_READ_SIZE:
+                        raise ValueError(f"{src} has no facets in its first {len(text)} bytes")
+                    pending = text
+                    continue
+                cut += len(b"endfacet")
+                text, pending = text[:cut], text[cut:]
+
+            coords = _VERTEX_RE.findall(text)
+            if coords:
+                try:
+                    values = np.fromstring(b" ".join(coords), dtype=np.float32, sep=" ")
+                except ValueError:
+                    raise ValueError(f"{src} has malformed vertex coordinates")
+                if len(values) % 9:
+                    raise ValueError(f"{src} has a facet without exactly three vertices")
+                writer.write(values.reshape(-1, 3, 3))
+
+            if not chunk:
+                break
+
+    if writer.count == 0:
+        raise ValueError(f"{src} contains no facets")
+    return writer.count
+
+def validate_binary_stl(path: str) -> int:
+    """Check a binary STL through a memory map; returns its facet count"""
+    count = binary_facet_count(path)
+    if count < 0:
+        raise ValueError(f"{path} is not a well-formed binary STL")
+    if count == 0:
+        raise ValueError(f"{path} contains no facets")
+    facets = read_binary_stl(path)
+    for start in range(0, count, WRITE_BATCH):
+        if not np.isfinite(facets["vertices"][start:start + WRITE_BATCH]).all():
+            raise ValueError(f"{path} has non-finite vertex coordinates (facets from {start})")
+    return count
+
+def _declared_facet_count(path: str) -> int:
+    """Header facet count of a binary STL with trailing bytes, or -1"""
+    size = os.path.getsize(path)
+    if size < HEADER_SIZE + 4:
+        return -1
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        (count,) = struct.unpack("<I", f.read(4))
+    return count if 0 < count and HEADER_SIZE + 4 + count * FACET_DTYPE.itemsize <= size else -1
+
+def normalize_stl(path: str, output_path: str = None) -> str:
+    """Turn an uploaded STL into a validated binary STL, without FreeCAD
+
+    Well-formed binary files are only validated (and copied when
+    `output_path` is given). ASCII files, and binary files with trailing
+    bytes, are rewritten to `output_path` or <stem>.binary.stl. Returns the
+    path of the binary STL.
+    """
+    if binary_facet_count(path) >= 0:
+        count = validate_binary_stl(path)
+        print(f"[stl] {path}: binary STL with {count} facets")
+        if output_path and output_path != path:
+            shutil.copy(path, output_path)
+            return output_path
+        return path
+
+    output_path = output_path or os.path.splitext(path)[0] + ".binary.stl"
+    if is_ascii_stl(path):
+        count = ascii_stl_to_binary(path, output_path)
+        print(f"[stl] {path}: ASCII STL -> binary, {count} facets, "
+              f"{os.path.getsize(output_path) / os.path.getsize(path):.0%} of the size")
+        return output_path
+
+    count = _declared_facet_count(path)
+    if count < 0:
+        raise ValueError(f"{path} is neither a binary nor an ASCII STL")
+    facets = np.memmap(path, dtype=FACET_DTYPE, mode='r', offset=HEADER_SIZE + 4, shape=(count,))
+    with BinarySTLWriter(output_path) as writer:
+        writer.write(facets["vertices"])
+    validate_binary_stl(output_path)
+    print(f"[stl] {path}: dropped trailing bytes after {count} facets")
+    return output_path
@@ -0,0 +1,196 @@
+import os
+import time
+import base64
+import asyncio
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+
+# Bytes held in memory per transfer at any one time
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Supabase's resumable (TUS) endpoint requires 6 MB chunks
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+RESUMABLE_THRESHOLD = int(os.getenv("RESUMABLE_UPLOAD_THRESHOLD_MB", "50")) * 1024 * 1024
+RESUMABLE_MAX_RETRIES = 5
+
+def _tus_metadata(**fields: str) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in fields.items())
+
+class StorageClient:
+    """Streaming access to Supabase Storage with bounded memory per transfer
+
+    Downloads are written to disk chunk by chunk, small uploads stream straight
+    from the file, and uploads above RESUMABLE_THRESHOLD go through the TUS
+    endpoint in fixed-size chunks so a dropped connection only costs one chunk.
+    """
+
+    def __init__(self, url: str, key: str, http: Optional[httpx.Client] = None):
+        self.base = f"{url.rstrip('/')}/storage/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        # One pooled client shared by every job thread
+        self.http = http or httpx.Client(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+
+    def _object_url(self, bucket: str, path: str) -> str:
+        return f"{self.base}/object/{bucket}/{quote(path)}"
+
+    def download_to_file(self, bucket: str, path: str, local_path: str) -> int:
+        """Stream an object to `local_path`; returns the number of bytes written"""
+        written = 0
+        with self.http.stream("GET", self._object_url(bucket, path), headers=self.headers) as response:
+            if response.status_code != 200:
+                response.read()
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+            with open(local_path, 'wb') as f:
+                for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+        return written
+
+    def upload_file(self, bucket: str, path: str, local_path: str, content_type: str) -> str:
+        """Upload a local file without reading it into memory; returns `path`"""
+        if os.path.getsize(local_path) >= RESUMABLE_THRESHOLD:
+            self._upload_resumable(bucket, path, local_path, content_type)
+            return path
+
+        headers = dict(self.headers, **{"content-type": content_type, "x-upsert": "true"})
+        with open(local_path, 'rb') as f:
+            response = self.http.post(self._object_url(bucket, path), content=f, headers=headers)
+        if response.status_code not in (200, 201):
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return path
+
+    def _upload_resumable(self, bucket: str, path: str, local_path: str, content_type: str):
+        size = os.path.getsize(local_path)
+        headers = dict(self.headers, **{"Tus-Resumable": "1.0.0", "x-upsert": "true"})
+
+        response = self.http.post(f"{self.base}/upload/resumable", headers=dict(headers, **{
+            "Upload-Length": str(size),
+            "Upload-Metadata": _tus_metadata(bucketName=bucket, objectName=path, contentType=content_type),
+        }))
+        if response.status_code != 201:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        location = response.headers["Location"]
+
+        offset = 0
+        retries = 0
+        with open(local_path, 'rb') as f:
+            while offset < size:
+                f.seek(offset)
+                chunk = f.read(RESUMABLE_CHUNK_SIZE)
+                try:
+                    response = self.http.patch(location, content=chunk, headers=dict(headers, **{
+                        "Upload-Offset": str(offset),
+                        "Content-Type": "application/offset+octet-stream",
+                    }))
+                    if response.status_code != 204:
+                        raise Exception(f"HTTP {response.status_code}: {response.text}")
+                    offset = int(response.headers["Upload-Offset"])
+                    retries = 0
+
+                except Exception as e:
+                    retries += 1
+                    if retries > RESUMABLE_MAX_RETRIES:
+                        raise Exception(f"Resumable upload gave up at {offset}/{size} bytes: {e}")
+                    print(f"[storage] chunk at {offset} failed ({e}), resuming")
+                    time.sleep(min(2 ** retries, 30))
+                    # Ask the server how much it actually has before resending
+                    try:
+                        head = self.http.head(location, headers=headers)
+                        if head.status_code == 200:
+                            offset = int(head.headers["Upload-Offset"])
+                    except Exception:
+                        pass
+
+async def _iter_file(local_path: str, start: int = 0, length: Optional[int] = None):
+    """Yield a file's bytes in STREAM_CHUNK_SIZE pieces (optionally a slice of it)"""
+    remaining = os.path.getsize(local_path) - start if length is None else length
+    with open(local_path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+class AsyncStorageClient:
+    """asyncio counterpart of StorageClient over a shared httpx.AsyncClient"""
+
+    def __init__(self, url: str, key: str, http: httpx.AsyncClient):
+        self.base = f"{url.rstrip('/')}/storage/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.http = http
+
+    def _object_url(self, bucket: str, path: str) -> str:
+        return f"{self.base}/object/{bucket}/{quote(path)}"
+
+    async def download_to_file(self, bucket: str, path: str, local_path: str) -> int:
+        """Stream an object to `local_path`; returns the number of bytes written"""
+        written = 0
+        async with self.http.stream("GET", self._object_url(bucket, path), headers=self.headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+            with open(local_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+        return written
+
+    async def upload_file(self, bucket: str, path: str, local_path: str, content_type: str) -> str:
+        """Upload a local file without reading it into memory; returns `path`"""
+        if os.path.getsize(local_path) >= RESUMABLE_THRESHOLD:
+            await self._upload_resumable(bucket, path, local_path, content_type)
+            return path
+
+        headers = dict(self.headers, **{"content-type": content_type, "x-upsert": "true",
+                                        "content-length": str(os.path.getsize(local_path))})
+        response = await self.http.post(self._object_url(bucket, path), content=_iter_file(local_path), headers=headers)
+        if response.status_code not in (200, 201):
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return path
+
+    async def _upload_resumable(self, bucket: str, path: str, local_path: str, content_type: str):
+        size = os.path.getsize(local_path)
+        headers = dict(self.headers, **{"Tus-Resumable": "1.0.0", "x-upsert": "true"})
+
+        response = await self.http.post(f"{self.base}/upload/resumable", headers=dict(headers, **{
+            "Upload-Length": str(size),
+            "Upload-Metadata": _tus_metadata(bucketName=bucket, objectName=path, contentType=content_type),
+        }))
+        if response.status_code != 201:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        location = response.headers["Location"]
+
+        offset = 0
+        retries = 0
+        while offset < size:
+            length = min(RESUMABLE_CHUNK_SIZE, size - offset)
+            try:
+                response = await self.http.patch(location, content=_iter_file(local_path, offset, length), headers=dict(headers, **{
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                    "Content-Length": str(length),
+                }))
+                if response.status_code != 204:
+                    raise Exception(f"HTTP {response.status_code}: {response.text}")
+                offset = int(response.headers["Upload-Offset"])
+                retries = 0
+
+            except Exception as e:
+                retries += 1
+                if retries > RESUMABLE_MAX_RETRIES:
+                    raise Exception(f"Resumable upload gave up at {offset}/{size} bytes: {e}")
+                print(f"[storage] chunk at {offset} failed ({e}), resuming")
+                await asyncio.sleep(min(2 ** retries, 30))
+                # Ask the server how much it actually has before resending
+                try:
+                    head = await self.http.head(location, headers=headers)
+                    if head.status_code == 200:
+                        offset = int(head.headers["Upload-Offset"])
+                except Exception:
+                    pass
@@ -0,0 +1,174 @@
+import os
+import zlib
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+from lod import lod_levels
+from stl_io import binary_facet_count, facet_normals, read_binary_stl
+
+# Edge length of the square PNG in pixels (0 disables thumbnails)
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+# Rendered at this multiple of THUMBNAIL_SIZE and box-filtered down (antialiasing)
+SUPERSAMPLE = 2
+# Pixel/triangle candidates rasterized per batch; bounds memory on huge faces
+RASTER_BATCH = 4_000_000
+
+# Same look as the web viewer: light blue model on a near-black background
+BACKGROUND = np.array([10, 10, 11], dtype=np.float32)
+BASE_COLOR = np.array([159, 183, 255], dtype=np.float32) / 255
+# Camera space (x right, y up, z towards the viewer): from the upper right
+LIGHT = np.array([0.45, 0.75, 0.5]) / np.linalg.norm([0.45, 0.75, 0.5])
+AMBIENT = 0.35
+
+def view_rotation() -> np.ndarray:
+    """World -> camera rotation for the viewer's default 3/4 view from (1, 0.8, 1)"""
+    forward = -np.array([1.0, 0.8, 1.0])
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, [0.0, 1.0, 0.0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    # Rows: screen x, screen y (up), depth (towards the camera)
+    return np.stack([right, up, -forward])
+
+def render(vertices: np.ndarray, size: int) -> np.ndarray:
+    """Rasterize (n, 3, 3) triangles to a (size, size, 3) uint8 image
+
+    Orthographic z-buffered rendering with per-facet Lambert shading. Every
+    triangle's bounding-box pixels are tested at once with barycentric
+    coordinates; the nearest covering facet wins each pixel.
+    """
+    ss = size * SUPERSAMPLE
+    image = np.empty((ss * ss, 3), dtype=np.float32)
+    image[:] = BACKGROUND
+
+    if len(vertices):
+        # The viewer's Y-up camera looks at STL's Z-up models from the front
+        zup_to_yup = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=np.float64)
+        rotation = view_rotation() @ zup_to_yup
+        tris = vertices.astype(np.float64) @ rotation.T
+
+        lo = tris.reshape(-1, 3).min(axis=0)
+        hi = tris.reshape(-1, 3).max(axis=0)
+        extent = max(hi[0] - lo[0], hi[1] - lo[1]) or 1.0
+        scale = ss * 0.9 / extent
+        center = (lo[:2] + hi[:2]) / 2
+        # Screen space: x right, y down, pixel centres at integer + 0.5
+        sx = (tris[:, :, 0] - center[0]) * scale + ss / 2
+        sy = (center[1] - tris[:, :, 1]) * scale + ss / 2
+        depth = tris[:, :, 2]
+
+        normals = facet_normals(vertices) @ rotation.T
+        # Two-sided lighting: STL winding is not always consistent, so every
+        # normal is flipped to face the camera before shading
+        normals *= np.where(normals[:, 2:] < 0, -1.0, 1.0)
+        shade = AMBIENT + (1 - AMBIENT) * np.clip(normals @ LIGHT, 0, 1)
+        colors = np.clip(shade[:, None] * BASE_COLOR * 255, 0, 255).astype(np.float32)
+
+        zbuffer = np.full(ss * ss, -np.inf)
+        facet = np.full(ss * ss, -1, dtype=np.int64)
+        _rasterize(sx, sy, depth, ss, zbuffer, facet)
+
+        covered = facet >= 0
+        image[covered] = colors[facet[covered]]
+
+    # Box filter down to the output size
+    image = image.reshape(size, SUPERSAMPLE, size, SUPERSAMPLE, 3).mean(axis=(1, 3))
+    return np.rint(image).astype(np.uint8)
+
+def _rasterize(sx: np.ndarray, sy: np.ndarray, depth: np.ndarray, ss: int,
+               zbuffer: np.ndarray, facet: np.ndarray):
+    """Z-buffer every triangle into `zbuffer` / `facet` (flat pixel arrays)"""
+    x0 = np.clip(np.floor(sx.min(axis=1)).astype(np.int64), 0, ss - 1)
+    x1 = np.clip(np.ceil(sx.max(axis=1)).astype(np.int64), 0, ss - 1)
+    y0 = np.clip(np.floor(sy.min(axis=1)).astype(np.int64), 0, ss - 1)
+    y1 = np.clip(np.ceil(sy.max(axis=1)).astype(np.int64), 0, ss - 1)
+    widths = x1 - x0 + 1
+    areas = widths * (y1 - y0 + 1)
+
+    # Signed doubled area; degenerate (edge-on) triangles cover nothing
+    ax, ay = sx[:, 0], sy[:, 0]
+    bx, by = sx[:, 1], sy[:, 1]
+    cx, cy = sx[:, 2], sy[:, 2]
+    det = (bx - ax) * (cy - ay) - (cx - ax) * (by - ay)
+    visible = np.abs(det) > 1e-12
+
+    order = np.flatnonzero(visible)
+    start = 0
+    while start < len(order):
+        # Grow the batch until it holds RASTER_BATCH candidates (at least one triangle)
+        counts = np.cumsum(areas[order[start:]])
+        stop = start + max(int(np.searchsorted(counts, RASTER_BATCH, side="right")), 1)
+        batch = order[start:stop]
+        start = stop
+
+        n = areas[batch]
+        tri = np.repeat(batch, n)
+        # Offset of each candidate within its triangle's bounding box
+        local = np.arange(len(tri)) - np.repeat(np.cumsum(n) - n, n)
+        px = x0[tri] + local % widths[tri]
+        py = y0[tri] + local // widths[tri]
+
+        qx, qy = px + 0.5, py + 0.5
+        w1 = ((qx - ax[tri]) * (cy[tri] - ay[tri]) - (cx[tri] - ax[tri]) * (qy - ay[tri])) / det[tri]
+        w2 = ((bx[tri] - ax[tri]) * (qy - ay[tri]) - (qx - ax[tri]) * (by[tri] - ay[tri])) / det[tri]
+        w0 = 1 - w1 - w2
+        inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+
+        tri, pixel = tri[inside], (py * ss + px)[inside]
+        z = w0[inside] * depth[tri, 0] + w1[inside] * depth[tri, 1] + w2[inside] * depth[tri, 2]
+
+        # Nearest candidate per pixel (largest z faces the camera)
+        order_z = np.lexsort((-z, pixel))
+        pixel, tri, z = pixel[order_z], tri[order_z], z[order_z]
+        first = np.ones(len(pixel), dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        pixel, tri, z = pixel[first], tri[first], z[first]
+
+        closer = z > zbuffer[pixel]
+        zbuffer[pixel[closer]] = z[closer]
+        facet[pixel[closer]] = tri[closer]
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def write_png(path: str, image: np.ndarray) -> int:
+    """Write an (h, w, 3) uint8 image as an RGB PNG; returns the bytes written"""
+    height, width, _ = image.shape
+    # Filter type 0 (none) in front of every scanline
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+    data = b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 9)),
+        _png_chunk(b"IEND", b""),
+    ])
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def thumbnail_source(stl_path: str) -> Optional[str]:
+    """Coarsest level of detail written next to `stl_path`, else the STL itself"""
+    stem = os.path.splitext(stl_path)[0]
+    for name, _ in lod_levels():
+        candidate = f"{stem}.{name}.stl"
+        if os.path.exists(candidate) and binary_facet_count(candidate) > 0:
+            return candidate
+    return stl_path if binary_facet_count(stl_path) > 0 else None
+
+def write_thumbnail(stl_path: str) -> Dict[str, str]:
+    """Render <stem>.thumb.png from the coarsest LOD; returns {"thumb": path} or {}"""
+    if THUMBNAIL_SIZE <= 0:
+        return {}
+    source = thumbnail_source(stl_path)
+    if source is None:
+        print(f"[thumb] {stl_path} is not a non-empty binary STL, skipping thumbnail")
+        return {}
+
+    vertices = np.asarray(read_binary_stl(source)["vertices"])
+    png_path = os.path.splitext(stl_path)[0] + ".thumb.png"
+    size = write_png(png_path, render(vertices, THUMBNAIL_SIZE))
+    print(f"[thumb] {len(vertices)} facets -> {THUMBNAIL_SIZE}px PNG, {size} bytes")
+    return {"thumb": png_path}
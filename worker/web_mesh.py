@@ -0,0 +1,142 @@
+import os
+import json
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+from lod import weld
+from stl_io import binary_facet_count, facet_normals, read_binary_stl
+
+# "glb" writes a welded, quantized glTF binary next to each STL; "none" skips it
+WEB_MESH_FORMAT = os.getenv("WEB_MESH_FORMAT", "glb")
+# Bump whenever a change alters the GLB written for the same STL
+WEB_MESH_VERSION = 2
+# Facet normals are binned on an N x N octahedral grid; corners of a vertex
+# only share a normal within a bin, which keeps hard CAD edges crisp
+NORMAL_BINS = 8
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+# glTF component types
+BYTE, UNSIGNED_SHORT, UNSIGNED_INT = 5120, 5123, 5125
+
+def _octahedral_bins(normals: np.ndarray) -> np.ndarray:
+    """Bin unit vectors on an octahedral map (0 for zero-length normals)"""
+    n = normals / np.maximum(np.abs(normals).sum(axis=1, keepdims=True), 1e-12)
+    u, v = n[:, 0], n[:, 1]
+    lower = n[:, 2] < 0
+    u_folded = (1 - np.abs(v)) * np.sign(u)
+    v_folded = (1 - np.abs(u)) * np.sign(v)
+    u = np.where(lower, u_folded, u)
+    v = np.where(lower, v_folded, v)
+    iu = np.clip(((u + 1) / 2 * NORMAL_BINS).astype(np.int64), 0, NORMAL_BINS - 1)
+    iv = np.clip(((v + 1) / 2 * NORMAL_BINS).astype(np.int64), 0, NORMAL_BINS - 1)
+    return iu * NORMAL_BINS + iv
+
+def indexed_mesh(vertices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weld (n, 3, 3) triangles into (positions, normals, indices)
+
+    Corners are merged when they share a position and a normal bin; each merged
+    vertex gets the area-weighted mean of its facets' normals.
+    """
+    points, corners = weld(vertices)
+    face_normals = facet_normals(vertices)
+    areas = np.linalg.norm(np.cross(
+        vertices[:, 1].astype(np.float64) - vertices[:, 0],
+        vertices[:, 2].astype(np.float64) - vertices[:, 0],
+    ), axis=1)
+
+    bins = np.repeat(_octahedral_bins(face_normals), 3)
+    keys = corners.reshape(-1) * (NORMAL_BINS * NORMAL_BINS) + bins
+    _, vertex = np.unique(keys, return_inverse=True)
+    vertex = vertex.reshape(-1)
+
+    count = vertex.max() + 1 if len(vertex) else 0
+    weighted = np.repeat(face_normals * areas[:, None], 3, axis=0)
+    normals = np.stack([np.bincount(vertex, weights=weighted[:, axis], minlength=count) for axis in range(3)], axis=1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+    positions = np.zeros((count, 3), dtype=np.float32)
+    positions[vertex] = points[corners.reshape(-1)]
+    return positions, normals, vertex.reshape(-1, 3)
+
+def _pad(data: bytes, fill: bytes) -> bytes:
+    return data + fill * (-len(data) % 4)
+
+def write_glb(path: str, positions: np.ndarray, normals: np.ndarray, indices: np.ndarray) -> int:
+    """Write a KHR_mesh_quantization GLB; returns the number of bytes written
+
+    Positions are 16-bit integers dequantized by the node's uniform scale and translation,
+    normals are normalized 8-bit, and indices use 16 bits when they fit.
+    """
+    lo = positions.min(axis=0).astype(np.float64) if len(positions) else np.zeros(3)
+    extent = positions.max(axis=0) - lo if len(positions) else np.zeros(3)
+    # One scale for every axis: renderers transform normals by the inverse
+    # transpose of the node matrix, which a non-uniform scale would skew
+    scale = np.full(3, extent.max() / 65535.0 if extent.max() > 0 else 1.0)
+
+    # Vertex attributes must be 4-byte aligned: pad each element to 8 / 4 bytes
+    qpos = np.zeros((len(positions), 4), dtype=np.uint16)
+    qpos[:, :3] = np.rint((positions - lo) / scale).clip(0, 65535)
+    qnorm = np.zeros((len(normals), 4), dtype=np.int8)
+    qnorm[:, :3] = np.rint(normals * 127).clip(-127, 127)
+
+    index_type = UNSIGNED_SHORT if len(positions) <= 65535 else UNSIGNED_INT
+    qidx = indices.astype(np.uint16 if index_type == UNSIGNED_SHORT else np.uint32).reshape(-1)
+
+    blobs = [_pad(qpos.tobytes(), b"\0"), _pad(qnorm.tobytes(), b"\0"), _pad(qidx.tobytes(), b"\0")]
+    offsets = np.cumsum([0] + [len(b) for b in blobs[:-1]]).tolist()
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "Showcase3D worker"},
+        "extensionsUsed": ["KHR_mesh_quantization"],
+        "extensionsRequired": ["KHR_mesh_quantization"],
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "translation": lo.tolist(), "scale": scale.tolist()}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2}]}],
+        "buffers": [{"byteLength": sum(len(b) for b in blobs)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": offsets[0], "byteLength": len(blobs[0]), "byteStride": 8, "target": 34962},
+            {"buffer": 0, "byteOffset": offsets[1], "byteLength": len(blobs[1]), "byteStride": 4, "target": 34962},
+            {"buffer": 0, "byteOffset": offsets[2], "byteLength": len(blobs[2]), "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": UNSIGNED_SHORT, "count": len(positions), "type": "VEC3",
+             "min": qpos[:, :3].min(axis=0).tolist() if len(positions) else [0, 0, 0],
+             "max": qpos[:, :3].max(axis=0).tolist() if len(positions) else [0, 0, 0]},
+            {"bufferView": 1, "componentType": BYTE, "normalized": True, "count": len(normals), "type": "VEC3"},
+            {"bufferView": 2, "componentType": index_type, "count": len(qidx), "type": "SCALAR"},
+        ],
+    }
+
+    json_chunk = _pad(json.dumps(gltf, separators=(",", ":")).encode(), b" ")
+    bin_chunk = b"".join(blobs)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+
+    with open(path, 'wb') as f:
+        f.write(struct.pack("<III", GLB_MAGIC, 2, total))
+        f.write(struct.pack("<II", len(json_chunk), CHUNK_JSON))
+        f.write(json_chunk)
+        f.write(struct.pack("<II", len(bin_chunk), CHUNK_BIN))
+        f.write(bin_chunk)
+    return total
+
+def write_web_mesh(stl_path: str) -> Dict[str, str]:
+    """Write <stem>.glb next to a binary STL; returns {"web": path} or {}"""
+    if WEB_MESH_FORMAT != "glb":
+        return {}
+    if binary_facet_count(stl_path) <= 0:
+        print(f"[web] {stl_path} is not a non-empty binary STL, skipping web mesh")
+        return {}
+
+    vertices = np.asarray(read_binary_stl(stl_path)["vertices"])
+    positions, normals, indices = indexed_mesh(vertices)
+    glb_path = os.path.splitext(stl_path)[0] + ".glb"
+    size = write_glb(glb_path, positions, normals, indices)
+    print(f"[web] {len(vertices)} facets -> {len(positions)} vertices, {size} bytes "
+          f"({size / os.path.getsize(stl_path):.0%} of the STL)")
+    return {"web": glb_path}
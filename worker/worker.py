@@ -1,57 +1,129 @@
 import os
 import time
+import socket
 import tempfile
+import threading
+from glob import escape as glob_escape, glob
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 from supabase import create_client, Client
-from typing import Optional, Dict, Any
-from convert_to_stl import convert_to_stl
+from typing import Optional, Dict, Any, List, Set
+from cache import ConversionCache, cache_key
+from convert_to_stl import conversion_params
+from engine import EnginePool
+from lod import lod_levels, write_lods
+from mesh_stats import mesh_stats
+from metrics import BYTES, ERRORS, JOB_LATENCY, JOBS, QUEUE_WAIT, TRIANGLES, JobTimer, start_metrics_server
+from stl_io import binary_facet_count, normalize_stl
+from storage import StorageClient
+from thumbnail import THUMBNAIL_SIZE, write_thumbnail
+from web_mesh import WEB_MESH_FORMAT, WEB_MESH_VERSION, write_web_mesh
+from notify import start_listener
 
 # Environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-POLL_INTERVAL = int(os.getenv("POLL_INTERVAL_SECONDS", "5"))
-
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL_SECONDS", "5"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL_SECONDS", "30"))
+# Upper bound on idle polling while LISTEN/NOTIFY is connected; only a safety net
+POLL_MAX_INTERVAL_LISTENING = float(os.getenv("POLL_MAX_INTERVAL_LISTENING_SECONDS", "300"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY") or os.cpu_count() or 1)
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+CONVERSION_CACHE_MAX_ENTRIES = int(os.getenv("CONVERSION_CACHE_MAX_ENTRIES", "1000"))
+# Claimed jobs hold a lease that a heartbeat renews every third of its length;
+# jobs whose lease runs out are re-queued by the next claim, up to MAX_ATTEMPTS
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Fair scheduling: each job a user already has ahead in the queue delays their
+# next one by FAIR_SHARE seconds, and estimated cost delays a job by up to
+# MAX_COST_PENALTY seconds (see claim_jobs)
+JOB_FAIR_SHARE_SECONDS = int(os.getenv("JOB_FAIR_SHARE_SECONDS", "60"))
+JOB_MAX_COST_PENALTY_SECONDS = int(os.getenv("JOB_MAX_COST_PENALTY_SECONDS", "600"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Created by init_clients() rather than at import, so the worker can also run
+# against stand-ins (see benchmarks/load_test.py)
+supabase: Optional[Client] = None
+storage: Optional[StorageClient] = None
+
+# Jobs run on threads (transfers and table updates are I/O bound) while the
+# FreeCAD conversions run in a pool of warm engine processes of the same size,
+# so every claimed job gets a core of its own. Engines start on first use.
+job_executor = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY, thread_name_prefix="job")
+engine_pool = EnginePool(WORKER_CONCURRENCY)
+active_jobs: Set[Future] = set()
+conversion_cache = ConversionCache(None, "cad-converted", CONVERSION_CACHE_MAX_ENTRIES)
+
+# Ids of the jobs this worker holds a lease on, and of those whose lease was lost
+leases_lock = threading.Lock()
+leased_jobs: Set[str] = set()
+lost_leases: Set[str] = set()
+
+# Set by the NOTIFY listener and by finishing jobs to cut the current sleep short
+wakeup = threading.Event()
+listener_connected = threading.Event()
+# True while the last claim filled every free slot, i.e. more work is likely queued
+backlogged = False
+
+def init_clients(client: Optional[Client] = None, storage_client: Optional[StorageClient] = None):
+    """Connect to Supabase, or use the given table/RPC and storage clients instead"""
+    global supabase, storage
+    supabase = client or create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    storage = storage_client or StorageClient(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    conversion_cache.client = supabase
 
 def download_file(input_path: str) -> str:
     """Download file from cad-uploaded bucket to /tmp"""
     try:
         print(f"[worker] downloading {input_path}")
 
-        # Download file from storage
-        response = supabase.storage.from_("cad-uploaded").download(input_path)
-
-        # Save to temp file
+        # Stream straight from storage into a temp file
         file_ext = input_path.split('.')[-1]
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}")
-        temp_file.write(response)
         temp_file.close()
+        try:
+            size = storage.download_to_file("cad-uploaded", input_path, temp_file.name)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
 
-        print(f"[worker] saved to {temp_file.name}")
+        print(f"[worker] saved {size} bytes to {temp_file.name}")
         return temp_file.name
 
     except Exception as e:
         raise Exception(f"Download failed: {e}")
 
-def upload_converted_file(local_path: str, user_id: str, job_id: str) -> str:
+def remove_job_files(local_input: str):
+    """Delete a job's temp files: the output and every derived file are named
+    after the downloaded input's unique stem, including ones left behind by a
+    failed or killed step"""
+    for path in glob(glob_escape(os.path.splitext(local_input)[0]) + ".*"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def converted_path(user_id: str, job_id: str, name: str = "full", ext: str = ".stl") -> str:
+    """Object path of one of a job's outputs in the cad-converted bucket"""
+    if name == "full":
+        return f"{user_id}/{job_id}{ext}"
+    return f"{user_id}/{job_id}.{name}{ext}"
+
+CONTENT_TYPES = {".stl": "model/stl", ".glb": "model/gltf-binary", ".png": "image/png"}
+
+def upload_converted_file(local_path: str, user_id: str, job_id: str, name: str = "full") -> str:
     """Upload converted STL to cad-converted bucket"""
     try:
         print(f"[worker] uploading {local_path}")
 
         # Generate output path
-        filename = f"{job_id}.stl"
-        output_path = f"{user_id}/{filename}"
+        ext = os.path.splitext(local_path)[1].lower()
+        output_path = converted_path(user_id, job_id, name, ext)
 
-        # Read file
-        with open(local_path, 'rb') as f:
-            file_data = f.read()
-
-        # Upload to cad-converted bucket
-        response = supabase.storage.from_("cad-converted").upload(
-            output_path,
-            file_data,
-            {"content-type": "model/stl"}
-        )
+        # Stream to cad-converted bucket (resumable for large outputs)
+        storage.upload_file("cad-converted", output_path, local_path, CONTENT_TYPES.get(ext, "application/octet-stream"))
 
         print(f"[worker] uploaded to {output_path}")
         return output_path
@@ -59,32 +131,158 @@ def upload_converted_file(local_path: str, user_id: str, job_id: str) -> str:
     except Exception as e:
         raise Exception(f"Upload failed: {e}")
 
-def poll_once():
-    """Poll for queued jobs and process them"""
-    print("[worker] polling for new jobs...")
+class LeaseLost(Exception):
+    """The job's lease expired and it was handed to another worker"""
+
+def renew_leases():
+    """Heartbeat: extend the leases of every job this worker is running"""
+    with leases_lock:
+        job_ids = list(leased_jobs - lost_leases)
+    if not job_ids:
+        return
+
+    response = supabase.rpc("renew_job_leases", {
+        "p_worker_id": WORKER_ID,
+        "p_job_ids": job_ids,
+        "p_lease_seconds": JOB_LEASE_SECONDS
+    }).execute()
+
+    renewed = set(response.data or [])
+    lost = [job_id for job_id in job_ids if job_id not in renewed]
+    if lost:
+        print(f"[worker] lost lease on job(s) {', '.join(lost)}")
+        with leases_lock:
+            # Jobs that finished while the RPC was in flight are not lost
+            lost_leases.update(job_id for job_id in lost if job_id in leased_jobs)
+
+def heartbeat_loop():
+    while True:
+        time.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            renew_leases()
+        except Exception as e:
+            print(f"[worker] lease heartbeat failed: {e}")
+
+def ensure_lease(job_id: str):
+    """Stop working on a job another worker has taken over"""
+    with leases_lock:
+        if job_id in lost_leases:
+            raise LeaseLost(f"Lease on job {job_id} expired")
+
+def derive_outputs(local_output: str) -> Dict[str, str]:
+    """Write levels of detail, the web mesh and the thumbnail; a failure here never fails the job"""
+    derived: Dict[str, str] = {}
+    # The thumbnail renders the coarsest level of detail, so it goes last
+    for stage in (write_lods, write_web_mesh, write_thumbnail):
+        try:
+            derived.update(engine_pool.call(stage, local_output))
+        except Exception as e:
+            print(f"[worker] skipping {stage.__name__}: {e}")
+    return derived
+
+def measure_output(local_output: str) -> Dict[str, Any]:
+    """Mesh statistics of the converted STL, or {} if they can't be computed"""
+    try:
+        return engine_pool.call(mesh_stats, local_output)
+    except Exception as e:
+        print(f"[worker] skipping mesh statistics: {e}")
+        return {}
+
+def claim_jobs(limit: int) -> List[Dict[str, Any]]:
+    """Atomically claim up to `limit` queued jobs for this worker, fairest first"""
+    response = supabase.rpc("claim_jobs", {
+        "p_worker_id": WORKER_ID,
+        "p_limit": limit,
+        "p_lease_seconds": JOB_LEASE_SECONDS,
+        "p_max_attempts": JOB_MAX_ATTEMPTS,
+        "p_fair_share_seconds": JOB_FAIR_SHARE_SECONDS,
+        "p_max_cost_penalty": JOB_MAX_COST_PENALTY_SECONDS
+    }).execute()
+    return response.data or []
+
+def free_slots() -> int:
+    """Number of jobs this worker can take on right now"""
+    for future in [f for f in active_jobs if f.done()]:
+        active_jobs.discard(future)
+    return WORKER_CONCURRENCY - len(active_jobs)
+
+def _on_job_done(future: Future):
+    """A slot just freed up: poll right away if the queue probably has more work"""
+    if backlogged:
+        wakeup.set()
+
+def next_poll_delay(delay: float, requested: int, claimed: int) -> float:
+    """Adaptive backoff: stay hot while there is work, back off while idle"""
+    max_delay = POLL_MAX_INTERVAL_LISTENING if listener_connected.is_set() else POLL_MAX_INTERVAL
+
+    if requested > 0 and claimed == requested:
+        # Every slot is busy; a finishing job or a NOTIFY wakes us up
+        return max_delay
+    if claimed > 0:
+        return POLL_INTERVAL
+    return min(max(delay, POLL_INTERVAL) * 2, max_delay)
+
+def poll_once() -> int:
+    """Claim as many queued jobs as there are free slots and dispatch them"""
+    slots = free_slots()
+    if slots <= 0:
+        return 0
+
+    print(f"[worker] polling for up to {slots} new job(s)...")
 
     try:
-        # Fetch oldest queued job
-        response = supabase.table("jobs").select("*").eq("status", "queued").order("created_at", desc=False).limit(1).execute()
+        jobs = claim_jobs(slots)
 
-        if not response.data or len(response.data) == 0:
+        if not jobs:
             print("[worker] no jobs in queue")
-            return
+            return 0
 
-        job = response.data[0]
-        print(f"[worker] found job {job['id']}")
+        for job in jobs:
+            print(f"[worker] claimed job {job['id']}")
+            future = job_executor.submit(process_job, job)
+            future.add_done_callback(_on_job_done)
+            active_jobs.add(future)
 
-        # Claim job by updating status to 'running'
-        supabase.table("jobs").update({
-            "status": "running",
-            "started_at": "now()"
-        }).eq("id", job["id"]).eq("status", "queued").execute()
-
-        # Process job
-        process_job(job)
+        return len(jobs)
 
     except Exception as e:
         print(f"[worker] error in poll_once: {e}")
+        return 0
+
+def input_cache_key(local_input: str) -> str:
+    """Cache key of a downloaded input under the current conversion settings"""
+    ext = os.path.splitext(local_input)[1].lower().lstrip('.')
+    params = dict(conversion_params(), ext=ext, lods=lod_levels(), web=[WEB_MESH_FORMAT, WEB_MESH_VERSION], thumb=THUMBNAIL_SIZE)
+    return cache_key(local_input, params)
+
+MESH_STAT_COLUMNS = ("bbox", "triangle_count", "vertex_count", "surface_area", "volume", "file_size")
+
+def ready_showcase_fields(outputs: Dict[str, str], mesh: Dict[str, Any]) -> Dict[str, Any]:
+    """Showcase columns to set once a job's outputs are uploaded"""
+    return {
+        "status": "ready",
+        "output_path": outputs["full"],
+        "lod_paths": {name: path for name, path in outputs.items() if name not in ("web", "thumb")},
+        "web_mesh_path": outputs.get("web"),
+        "thumbnail_path": outputs.get("thumb"),
+        **{column: mesh.get(column) for column in MESH_STAT_COLUMNS}
+    }
+
+def queue_wait_seconds(job: Dict[str, Any]) -> Optional[float]:
+    """Seconds between a job's creation and its claim, from the claimed row"""
+    try:
+        created = datetime.fromisoformat(job["created_at"])
+        started = datetime.fromisoformat(job["started_at"])
+        return max((started - created).total_seconds(), 0.0)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def cache_metrics() -> List[str]:
+    """Conversion cache counters in Prometheus text format"""
+    lines = ["# HELP worker_cache_events_total Conversion cache events", "# TYPE worker_cache_events_total counter"]
+    for name, value in conversion_cache.stats().items():
+        lines.append(f'worker_cache_events_total{{event="{name}"}} {value}')
+    return lines
 
 def process_job(job: Dict[str, Any]):
     """Process a single job: download -> convert -> upload -> update status"""
@@ -92,70 +290,164 @@ def process_job(job: Dict[str, Any]):
     showcase_id = job["showcase_id"]
     input_path = job["input_path"]
 
+    timer = JobTimer()
+    queue_wait = queue_wait_seconds(job)
+    if queue_wait is not None:
+        timer.stages["queue_wait"] = round(queue_wait, 4)
+        QUEUE_WAIT.observe(queue_wait)
+
+    stats: Dict[str, Any] = {}
+    local_input: Optional[str] = None
+    with leases_lock:
+        leased_jobs.add(job_id)
+
     try:
-        print(f"[worker] processing job {job_id}")
+        print(f"[worker] processing job {job_id} (attempt {job.get('attempt_count', 1)})")
 
         # Extract user_id from input_path (format: user_id/filename.ext)
         user_id = input_path.split('/')[0]
 
         # 1. Download file from cad-uploaded bucket
-        local_input = download_file(input_path)
-
-        # 2. Convert to STL using FreeCAD (or skip if already STL)
+        with timer.stage("download"):
+            local_input = download_file(input_path)
+        stats["input_bytes"] = os.path.getsize(local_input)
+        BYTES.inc(stats["input_bytes"], direction="download")
+
+        # 2. Convert to STL using FreeCAD (or just normalize if already STL),
+        #    measure it, then derive coarser levels of detail, a compact web
+        #    mesh and a thumbnail
+        # 3. Upload everything to cad-converted bucket
         file_ext = os.path.splitext(local_input)[1].lower()
-        if file_ext == '.stl':
-            # Already STL, no conversion needed
-            print(f"[worker] file is already STL, skipping conversion")
-            local_output = local_input
+        with timer.stage("hash"):
+            key = input_cache_key(local_input)
+        local_outputs: Dict[str, str] = {}
+        mesh: Dict[str, Any] = {}
+
+        # Identical input converted before: reuse those outputs
+        with timer.stage("cache_fetch"):
+            cached = conversion_cache.fetch(key, lambda name, ext: converted_path(user_id, job_id, name, ext))
+        if cached is not None:
+            outputs, metadata = cached
+            stats["output_bytes"] = metadata.get("output_bytes")
+            stats["triangle_count"] = metadata.get("triangle_count")
+            mesh = metadata.get("mesh") or {}
         else:
-            # Convert STEP/OBJ to STL
-            local_output = local_input.replace(os.path.splitext(local_input)[1], ".stl")
-            convert_to_stl(local_input, local_output)
-
-        # 3. Upload to cad-converted bucket
-        output_path = upload_converted_file(local_output, user_id, job_id)
-
-        # 4. Update job status to complete
-        supabase.table("jobs").update({
-            "status": "complete",
-            "output_path": output_path,
-            "finished_at": "now()"
-        }).eq("id", job_id).execute()
-
-        # 5. Update showcase status to ready
-        supabase.table("showcases").update({
-            "status": "ready",
-            "output_path": output_path
-        }).eq("id", showcase_id).execute()
-
-        print(f"[worker] job {job_id} completed successfully")
-
-        # 6. Clean up temp files
-        os.remove(local_input)
-        if local_output != local_input:  # Don't try to remove same file twice
-            os.remove(local_output)
+            with timer.stage("convert"):
+                if file_ext == '.stl':
+                    # Already STL: only validated, or rewritten if it is ASCII
+                    local_output = engine_pool.call(normalize_stl, local_input)
+                else:
+                    # Convert STEP/OBJ to STL
+                    local_output = local_input.replace(os.path.splitext(local_input)[1], ".stl")
+                    engine_pool.convert(local_input, local_output)
+
+            stats["output_bytes"] = os.path.getsize(local_output)
+            triangles = binary_facet_count(local_output)
+            stats["triangle_count"] = triangles if triangles >= 0 else None
+
+            with timer.stage("stats"):
+                mesh = measure_output(local_output)
+            with timer.stage("derive"):
+                local_outputs = dict(derive_outputs(local_output), full=local_output)
+            ensure_lease(job_id)
+            with timer.stage("upload"):
+                outputs = {
+                    name: upload_converted_file(path, user_id, job_id, name)
+                    for name, path in local_outputs.items()
+                }
+            BYTES.inc(sum(os.path.getsize(path) for path in local_outputs.values()), direction="upload")
+            with timer.stage("cache_store"):
+                conversion_cache.store(key, outputs, stats["output_bytes"], {
+                    "output_bytes": stats["output_bytes"],
+                    "triangle_count": stats["triangle_count"],
+                    "mesh": mesh
+                })
+
+        if stats.get("triangle_count"):
+            TRIANGLES.inc(stats["triangle_count"])
+        output_path = outputs["full"]
+        ensure_lease(job_id)
+
+        # 4. Update showcase status to ready
+        with timer.stage("update_showcase"):
+            supabase.table("showcases").update(ready_showcase_fields(outputs, mesh)).eq("id", showcase_id).execute()
+
+        # 5. Update job status to complete, with everything measured so far
+        #    (this update's own latency only reaches the metrics endpoint)
+        with timer.stage("update_job"):
+            supabase.table("jobs").update({
+                "status": "complete",
+                "output_path": output_path,
+                "finished_at": "now()",
+                "stage_timings": dict(timer.stages),
+                **stats
+            }).eq("id", job_id).eq("claimed_by", WORKER_ID).execute()
+
+        JOBS.inc(status="complete")
+        JOB_LATENCY.observe(timer.elapsed())
+        print(f"[worker] job {job_id} completed successfully in {timer.elapsed():.2f}s {timer.stages}")
+
+    except LeaseLost as e:
+        # Another worker owns the job now; leave its rows alone
+        print(f"[worker] abandoning job {job_id}: {e}")
+        JOBS.inc(status="abandoned")
 
     except Exception as e:
-        print(f"[worker] job {job_id} failed: {e}")
+        print(f"[worker] job {job_id} failed in {timer.current or 'other'}: {e}")
+        JOBS.inc(status="failed")
+        ERRORS.inc(stage=timer.current or "other")
+        JOB_LATENCY.observe(timer.elapsed())
 
-        # Update job status to failed
-        supabase.table("jobs").update({
+        # Update job status to failed (only while this worker still owns it)
+        response = supabase.table("jobs").update({
             "status": "failed",
             "finished_at": "now()",
-            "error": str(e)
-        }).eq("id", job_id).execute()
+            "error": str(e),
+            "stage_timings": dict(timer.stages),
+            **stats
+        }).eq("id", job_id).eq("claimed_by", WORKER_ID).execute()
 
         # Update showcase status to failed
-        supabase.table("showcases").update({
-            "status": "failed"
-        }).eq("id", showcase_id).execute()
+        if response.data:
+            supabase.table("showcases").update({
+                "status": "failed"
+            }).eq("id", showcase_id).execute()
+
+    finally:
+        with leases_lock:
+            leased_jobs.discard(job_id)
+            lost_leases.discard(job_id)
+
+        # 6. Clean up temp files, however the job ended
+        if local_input:
+            remove_job_files(local_input)
+
+def run(stop: Optional[threading.Event] = None):
+    """Poll and dispatch jobs until `stop` is set (forever by default)"""
+    global backlogged
+    delay = POLL_INTERVAL
+    while stop is None or not stop.is_set():
+        wakeup.clear()
+        requested = claimed = 0
+        try:
+            requested = free_slots()
+            claimed = poll_once()
+        except Exception as e:
+            print(f"[worker] error: {e}")
+
+        if requested > 0:
+            backlogged = claimed == requested
+        delay = next_poll_delay(delay, requested, claimed)
+        wakeup.wait(delay)
 
 if __name__ == "__main__":
     print("[worker] starting...")
     print(f"[worker] Supabase URL: {SUPABASE_URL}")
-    print(f"[worker] Poll interval: {POLL_INTERVAL}s")
+    print(f"[worker] Poll interval: {POLL_INTERVAL}s (backing off to {POLL_MAX_INTERVAL}s when idle)")
+    print(f"[worker] Worker id: {WORKER_ID} (concurrency {WORKER_CONCURRENCY})")
 
     # Test connection
+    init_clients()
     try:
         response = supabase.table("jobs").select("count").limit(1).execute()
         print("[worker] Supabase connection successful")
@@ -163,9 +455,9 @@ if __name__ == "__main__":
         print(f"[worker] Supabase connection failed: {e}")
         exit(1)
 
-    while True:
-        try:
-            poll_once()
-        except Exception as e:
-            print(f"[worker] error: {e}")
-        time.sleep(POLL_INTERVAL)
+    engine_pool.start()
+    threading.Thread(target=heartbeat_loop, name="lease-heartbeat", daemon=True).start()
+    start_metrics_server(METRICS_HOST, METRICS_PORT, cache_metrics)
+    start_listener(SUPABASE_DB_URL, wakeup, listener_connected)
+
+    run()